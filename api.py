@@ -0,0 +1,338 @@
+# api.py - Headless JSON API over the hms data layer for kiosks and lab systems
+#
+#   python api.py --port 8000            (or: uvicorn api:app --workers 4)
+#
+#   GET    /api/<resource>?limit=50&cursor=..&sort=..&desc=1&detailed=1&archive=1
+#   GET    /api/<resource>?q=smith                 ranked search, first 100 hits
+#   GET    /api/<resource>/<id>
+#   POST   /api/<resource>          one object or a list of them (bulk insert)
+#   PATCH  /api/<resource>/<id>     one object of changed fields
+#   PATCH  /api/<resource>          a list of objects, each with its primary key (bulk update)
+#   DELETE /api/<resource>/<id>
+#
+# Starlette and uvicorn come with streamlit, but nothing here imports
+# streamlit. Reads run the cached hms helpers on the thread pool; writes go
+# to the writer thread (hms.writer), whose Futures are awaited without
+# holding a thread, so a bulk request is one group-committed transaction.
+import argparse
+import asyncio
+import base64
+import binascii
+import json
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from hms import cache, crud, db, frames, migrations, pagination, scheduling, writer
+from hms.schema import DETAIL_VIEWS, PRIMARY_KEYS, table_columns
+
+RESOURCES = {
+    "patients": "Patients",
+    "doctors": "Doctors",
+    "appointments": "Appointments",
+    "medical-records": "MedicalRecords",
+    "billings": "Billings",
+}
+# The column the Streamlit pages search when a table has no FTS index.
+SEARCH_COLUMNS = {"Patients": "name", "Doctors": "name", "Appointments": "app_date",
+                  "MedicalRecords": "diagnosis", "Billings": "details"}
+# Fields a create must carry, as on the Streamlit "Add New" forms.
+REQUIRED = {
+    "Patients": ("name", "phone", "gender"),
+    "Doctors": ("name",),
+    "Appointments": ("pat_id", "doc_id", "app_date", "app_time"),
+    "MedicalRecords": ("pat_id", "doc_id"),
+    "Billings": ("pat_id",),
+}
+SCALARS = (str, int, float, bool, type(None))
+MAX_PAGE_SIZE = 500
+MAX_BULK = 1000
+
+
+class ApiError(ValueError):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# --------------------- Encoding ---------------------
+def _records(df):
+    # to_json writes NA as null and categoricals as their labels, without a
+    # Python object per cell.
+    return df.to_json(orient="records", date_format="iso")
+
+
+def _json(body, status=200):
+    return Response(body, status_code=status, media_type="application/json")
+
+
+def _encode_cursor(cursor, sort, descending):
+    # The sort it was taken in travels with the cursor: its value only means
+    # something compared against the same column in the same direction.
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps([*cursor, sort, descending]).encode()).decode()
+
+
+def _decode_cursor(token, sort, descending):
+    if not token:
+        return None
+    try:
+        value, last_pk, cursor_sort, cursor_desc = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError, binascii.Error):
+        raise ApiError(400, "Malformed cursor") from None
+    # Only what _encode_cursor produces: [sort value, primary key, sort, desc].
+    if not isinstance(value, SCALARS) or not isinstance(last_pk, int) or isinstance(last_pk, bool):
+        raise ApiError(400, "Malformed cursor")
+    if cursor_sort != sort or cursor_desc is not descending:
+        raise ApiError(400, "Cursor is for a different sort; start again without it")
+    return value, last_pk
+
+
+def _flag(request, name):
+    return request.query_params.get(name, "0").lower() in ("1", "true", "yes")
+
+
+def _int_param(request, name, default, low, high):
+    try:
+        value = int(request.query_params.get(name, default))
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer") from None
+    return min(max(value, low), high)
+
+
+# --------------------- Validation ---------------------
+def _table(request):
+    table_name = RESOURCES.get(request.path_params["resource"])
+    if table_name is None:
+        raise ApiError(404, f"Unknown resource: {request.path_params['resource']}")
+    return table_name
+
+
+def _record_id(request):
+    try:
+        return int(request.path_params["record_id"])
+    except ValueError:
+        raise ApiError(404, "Not found") from None
+
+
+def _fields(table_name, item, allow_pk=False, create=False):
+    # Checks one JSON object against the table's columns, the required
+    # fields and the column dtypes in hms.frames; returns it as {column: value}.
+    if not isinstance(item, dict) or not item:
+        raise ApiError(400, "Each item must be a non-empty JSON object")
+    columns = set(table_columns(table_name))
+    if not allow_pk:
+        columns.discard(PRIMARY_KEYS[table_name])
+    unknown = sorted(set(item) - columns)
+    if unknown:
+        raise ApiError(400, f"Unknown field(s) for {table_name}: {', '.join(unknown)}")
+    required = REQUIRED[table_name] if create else [f for f in REQUIRED[table_name] if f in item]
+    missing = [f for f in required if item.get(f) is None]
+    if missing:
+        raise ApiError(400, f"Field(s) required for {table_name}: {', '.join(missing)}")
+    for column, value in item.items():
+        if not isinstance(value, SCALARS):
+            raise ApiError(400, f"{column} must be a string, number or null")
+        if value is not None:
+            _check_type(column, value, frames.COLUMN_DTYPES.get(column))
+    return item
+
+
+def _check_type(column, value, dtype):
+    # SQLite would store any of these as given, so a value must also fit the
+    # dtype hms.frames reads the column back as.
+    number = isinstance(value, (int, float)) and not isinstance(value, bool)
+    if isinstance(dtype, pd.CategoricalDtype):
+        if value not in dtype.categories:
+            raise ApiError(400, f"{column} must be one of {', '.join(dtype.categories)}")
+    elif pd.api.types.is_integer_dtype(dtype):
+        if not number or isinstance(value, float):
+            raise ApiError(400, f"{column} must be an integer")
+        try:
+            pd.array([value], dtype=dtype)
+        except (TypeError, OverflowError):
+            raise ApiError(400, f"{column} is out of range") from None
+    elif pd.api.types.is_float_dtype(dtype) and not number:
+        raise ApiError(400, f"{column} must be a number")
+
+
+async def _body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise ApiError(400, "Body must be JSON") from None
+
+
+def _items(table_name, body, allow_pk=False, create=False):
+    items = body if isinstance(body, list) else [body]
+    if not items or len(items) > MAX_BULK:
+        raise ApiError(400, f"Send between 1 and {MAX_BULK} items")
+    return [_fields(table_name, item, allow_pk, create) for item in items]
+
+
+async def _write(submit, *args):
+    # writer.submit may block briefly when its queue is full, so it is called
+    # off the event loop; the Future itself is awaited without a thread.
+    future = await run_in_threadpool(submit, *args)
+    return await asyncio.wrap_future(future)
+
+
+# --------------------- Endpoints ---------------------
+async def list_rows(request):
+    table_name = _table(request)
+    detailed = _flag(request, "detailed")
+    source = DETAIL_VIEWS.get(table_name, table_name) if detailed else table_name
+    query = request.query_params.get("q")
+    if query:
+        df = await run_in_threadpool(crud.search_records, table_name, SEARCH_COLUMNS[table_name], query,
+                                     detailed=detailed)
+        return _json(f'{{"rows": {_records(df)}, "next_cursor": null}}')
+
+    sort = request.query_params.get("sort")
+    if sort is not None and sort not in table_columns(source):
+        raise ApiError(400, f"Cannot sort {table_name} by {sort}")
+    descending = _flag(request, "desc")
+    page = await run_in_threadpool(
+        pagination.fetch_page, source, sort_column=sort,
+        page_size=_int_param(request, "limit", 50, 1, MAX_PAGE_SIZE),
+        cursor=_decode_cursor(request.query_params.get("cursor"), sort, descending), descending=descending,
+        include_archive=_flag(request, "archive"))
+    next_cursor = _encode_cursor(page.next_cursor, sort, descending)
+    return _json(f'{{"rows": {_records(page.rows)}, "next_cursor": {json.dumps(next_cursor)}}}')
+
+
+async def get_row(request):
+    table_name = _table(request)
+    row = await run_in_threadpool(crud.get_record, table_name, PRIMARY_KEYS[table_name], _record_id(request))
+    if row is None:
+        raise ApiError(404, "Not found")
+    return JSONResponse(dict(zip(table_columns(table_name), row)))
+
+
+async def create_rows(request):
+    table_name = _table(request)
+    items = _items(table_name, await _body(request), create=True)
+    if table_name == "Appointments":
+        ids = await _write(scheduling.book_many_async, items)
+    else:
+        # Each row names its own fields, so omitted ones get the column default.
+        ids = await _write(crud.insert_many_async, table_name,
+                           [(list(item), list(item.values())) for item in items])
+    return JSONResponse({"ids": ids}, status_code=201)
+
+
+async def update_row(request):
+    table_name = _table(request)
+    record_id = _record_id(request)
+    body = await _body(request)
+    if not isinstance(body, dict):
+        raise ApiError(400, "Send one JSON object to update a single row")
+    item = _fields(table_name, body)
+    return await _update(table_name, [dict(item, **{PRIMARY_KEYS[table_name]: record_id})])
+
+
+async def update_rows(request):
+    table_name = _table(request)
+    body = await _body(request)
+    if not isinstance(body, list):
+        raise ApiError(400, "Bulk updates take a JSON list")
+    items = _items(table_name, body, allow_pk=True)
+    pk = PRIMARY_KEYS[table_name]
+    if any(not isinstance(item.get(pk), int) for item in items):
+        raise ApiError(400, f"Every item needs an integer {pk}")
+    return await _update(table_name, items)
+
+
+async def _update(table_name, items):
+    pk = PRIMARY_KEYS[table_name]
+    if table_name == "Appointments":
+        await _write(scheduling.book_many_async, [dict(item, app_id=item[pk]) for item in items])
+        return JSONResponse({"updated": len(items)})
+    changes = []
+    for item in items:
+        fields = [f for f in item if f != pk]
+        if not fields:
+            raise ApiError(400, "Nothing to update")
+        changes.append((item[pk], fields, [item[f] for f in fields]))
+    missing = await _write(crud.update_many_async, table_name, pk, changes)
+    if missing:
+        # The updates to rows that exist are committed; the rest are listed.
+        return JSONResponse({"updated": len(items) - len(missing), "missing": missing}, status_code=404)
+    return JSONResponse({"updated": len(items)})
+
+
+async def delete_row(request):
+    table_name = _table(request)
+    deleted = await _write(crud.delete_record_async, table_name, PRIMARY_KEYS[table_name], _record_id(request))
+    if not deleted:
+        raise ApiError(404, "Not found")
+    return Response(status_code=204)
+
+
+async def health(request):
+    return JSONResponse({"db_file": db.DB_FILE, "writer": writer.stats(), "cache": cache.stats()})
+
+
+# --------------------- Errors & App ---------------------
+async def api_error(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=exc.status)
+
+
+async def write_error(request, exc):
+    # Raised from the writer thread or the data layer.
+    if isinstance(exc, scheduling.SlotConflict):
+        return JSONResponse({"error": str(exc), "existing_app_id": exc.existing_app_id}, status_code=409)
+    if isinstance(exc, LookupError):
+        return JSONResponse({"error": str(exc)}, status_code=404)
+    if isinstance(exc, writer.WriterBusy):
+        return JSONResponse({"error": str(exc)}, status_code=503, headers={"Retry-After": "1"})
+    if isinstance(exc, sqlite3.OperationalError):
+        # e.g. "database is locked" past busy_timeout: worth retrying.
+        return JSONResponse({"error": str(exc)}, status_code=503, headers={"Retry-After": "1"})
+    if isinstance(exc, sqlite3.Error):
+        return JSONResponse({"error": f"Rejected by the database: {exc}"}, status_code=400)
+    return JSONResponse({"error": str(exc)}, status_code=400)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(migrations.migrate)
+    yield
+    await run_in_threadpool(writer.stop)
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/api/{resource}", list_rows, methods=["GET"]),
+        Route("/api/{resource}", create_rows, methods=["POST"]),
+        Route("/api/{resource}", update_rows, methods=["PATCH"]),
+        Route("/api/{resource}/{record_id}", get_row, methods=["GET"]),
+        Route("/api/{resource}/{record_id}", update_row, methods=["PATCH"]),
+        Route("/api/{resource}/{record_id}", delete_row, methods=["DELETE"]),
+    ],
+    exception_handlers={ApiError: api_error, ValueError: write_error, LookupError: write_error,
+                        writer.WriterBusy: write_error, sqlite3.Error: write_error},
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the hospital data over a JSON API.")
+    parser.add_argument("--db", default=db.DB_FILE)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    import uvicorn
+    # Worker processes (uvicorn --workers) read the path from the environment.
+    os.environ["HMS_DB_FILE"] = args.db
+    db.configure(args.db)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
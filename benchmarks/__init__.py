@@ -0,0 +1 @@
+# benchmarks - Synthetic data generation and timing for the data-access helpers
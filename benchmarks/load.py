@@ -0,0 +1,280 @@
+# benchmarks/load.py - Drive concurrent simulated front-desk sessions against the app
+#
+#   python -m benchmarks.load --rows 100000 --sessions 16 --duration 60
+#   python -m benchmarks.load --db bench_100000.db --sessions 8 --mode process --out load.json
+#
+# Each session is one Streamlit AppTest of Hospital_management.py clicking
+# through a weighted mix of front-desk actions. Processes (the default) run
+# sessions truly concurrently, each with its own read cache and writer
+# thread, like replicas contending for the SQLite write lock. AppTest keeps
+# its runtime in process-global state, so thread sessions share one
+# interpreter but take turns rerunning: that mode measures one server's
+# shared cache and writer under interleaved sessions, not parallel reruns.
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hms import cache, db, profiling, writer
+from hms.schema import PRIMARY_KEYS
+
+from benchmarks import synth
+from benchmarks.run import APP_SCRIPT
+
+# Relative frequency of each action in a session.
+WEIGHTS = {"open_home": 2, "search_patient": 4, "book_appointment": 2, "update_bill": 2}
+SEARCH_TERMS = [name[:3].lower() for name in synth.FIRST_NAMES + synth.LAST_NAMES]
+BILL_SAMPLE = 2000
+
+_rerun_lock = threading.Lock()
+
+
+def _percentile(samples, q):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+
+
+def _latency(samples_ms):
+    return dict(reruns=len(samples_ms), p50_ms=_percentile(samples_ms, 0.50),
+                p95_ms=_percentile(samples_ms, 0.95), p99_ms=_percentile(samples_ms, 0.99),
+                max_ms=max(samples_ms) if samples_ms else None)
+
+
+def _widget(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"no widget labelled {label!r}")
+
+
+# --------------------- Session ---------------------
+class Session:
+    # One simulated user. Every AppTest.run() is one rerun and one latency
+    # sample, tagged with the action that caused it.
+    def __init__(self, rng, targets):
+        self.rng = rng
+        self.targets = targets
+        self.samples = []        # (action, ms)
+        self.errors = []
+        self.open()
+
+    def open(self):
+        # A fresh browser tab: new session state, landing on Home.
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(APP_SCRIPT, default_timeout=120)
+        self.page = None
+        self._run("open_home", self.at)
+        self.page = "🏠 Home"
+
+    def _run(self, action, element):
+        # Latency is the rerun itself; the wait for _rerun_lock is not counted.
+        with _rerun_lock:
+            started = time.perf_counter()
+            element.run()
+            self.samples.append((action, (time.perf_counter() - started) * 1000))
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+
+    def _goto(self, action, page, tab_key=None, tab=None):
+        if self.page != page:
+            self._run(action, self.at.sidebar.radio[0].set_value(page))
+            self.page = page
+        if tab_key and self.at.session_state[tab_key] != tab:
+            self.at.session_state[tab_key] = tab
+            self._run(action, self.at)
+
+    def open_home(self):
+        self.page = None
+        self._goto("open_home", "🏠 Home")
+
+    def search_patient(self):
+        self._goto("search_patient", "👥 Patients", "patients_tabs", "📋 View & Manage")
+        term = self.rng.choice(SEARCH_TERMS)
+        self._run("search_patient", _widget(self.at.text_input, "🔍 Search by Name or Phone").set_value(term))
+
+    def book_appointment(self):
+        self._goto("book_appointment", "🗓️ Appointments", "appointments_tabs", "➕ Book New Appointment")
+        day = datetime.date.today() + datetime.timedelta(days=self.rng.randint(0, 60))
+        slot = datetime.time(self.rng.randint(8, 17), self.rng.choice([0, 15, 30, 45]))
+        _widget(self.at.number_input, "Patient ID *").set_value(self.rng.randint(1, self.targets["patients"]))
+        _widget(self.at.number_input, "Doctor ID *").set_value(self.rng.randint(1, self.targets["doctors"]))
+        _widget(self.at.date_input, "Appointment Date").set_value(day)
+        _widget(self.at.time_input, "Appointment Time").set_value(slot)
+        self._run("book_appointment", _widget(self.at.button, "✅ Book Appointment").click())
+
+    def update_bill(self):
+        self._goto("update_bill", "💰 Billings", "billings_tabs", "📋 View & Manage")
+        bill_id = self.rng.choice(self.targets["bills"])
+        self._run("update_bill", _widget(self.at.number_input, "Bill ID to Update").set_value(bill_id))
+        _widget(self.at.selectbox, "Payment Status").set_value(self.rng.choice(["Pending", "Paid", "Overdue"]))
+        self._run("update_bill", _widget(self.at.button, "Update Bill").click())
+
+    def step(self):
+        action = self.rng.choices(list(WEIGHTS), weights=list(WEIGHTS.values()))[0]
+        try:
+            getattr(self, action)()
+        except Exception as e:
+            # The page is in an unknown state after a failure; start over in a
+            # new tab. If even that fails the session gives up.
+            self.errors.append((action, str(e)))
+            self.open()
+
+
+def run_session(index, seed, targets, deadline, actions):
+    # Runs until `deadline` (time.time()) or after `actions` actions.
+    session = Session(random.Random(seed * 1000 + index), targets)
+    done = 0
+    while time.time() < deadline and (actions is None or done < actions):
+        session.step()
+        done += 1
+    return {"samples": session.samples, "errors": session.errors, "actions": done}
+
+
+def _process_session(index, seed, targets, deadline, actions):
+    # Each process has its own lock-wait ring, so it ships its waits back.
+    result = run_session(index, seed, targets, deadline, actions)
+    writer.stop()
+    result["lock_waits_ms"] = profiling.lock_waits()
+    result["peak_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+
+# --------------------- Driver ---------------------
+def _targets():
+    # Ids the sessions pick from. Bills come from the hot table only: an
+    # archived bill cannot be opened in the update form.
+    sizes = {t: db.fetch_one(f"SELECT MAX({pk}) FROM {t}")[0] or 0 for t, pk in PRIMARY_KEYS.items()}
+    bills = [row[0] for row in db.fetch_all("SELECT bill_id FROM Billings ORDER BY RANDOM() LIMIT ?",
+                                             (BILL_SAMPLE,))]
+    if not sizes["Patients"] or not sizes["Doctors"] or not bills:
+        raise SystemExit("the database needs patients, doctors and bills to load-test against")
+    return {"patients": sizes["Patients"], "doctors": sizes["Doctors"], "bills": bills}, sizes
+
+
+def run(sessions, mode, duration, actions, seed):
+    targets, _ = _targets()
+    deadline = time.time() + duration if duration else float("inf")
+    profiling.clear()
+    started = time.perf_counter()
+    if mode == "process":
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(sessions) as pool:
+            results = pool.starmap(_process_session,
+                                   [(i, seed, targets, deadline, actions) for i in range(sessions)])
+        lock_waits = [w for r in results for w in r["lock_waits_ms"]]
+        peak_rss_kib = max(r["peak_rss_kib"] for r in results)
+    else:
+        with ThreadPoolExecutor(sessions) as pool:
+            futures = [pool.submit(run_session, i, seed, targets, deadline, actions) for i in range(sessions)]
+            results = [f.result() for f in futures]
+        lock_waits = profiling.lock_waits()
+        peak_rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    elapsed = time.perf_counter() - started
+
+    samples = [s for r in results for s in r["samples"]]
+    errors = [e for r in results for e in r["errors"]]
+    by_action = {}
+    for action, ms in samples:
+        by_action.setdefault(action, []).append(ms)
+    completed = sum(r["actions"] for r in results)
+    return {
+        "sessions": sessions,
+        "mode": mode,
+        "elapsed_s": elapsed,
+        "actions": completed,
+        "errors": len(errors),
+        "locked_errors": sum("database is locked" in message for _, message in errors),
+        "error_samples": sorted({f"{action}: {message}" for action, message in errors})[:10],
+        "throughput": {"actions_per_s": completed / elapsed, "reruns_per_s": len(samples) / elapsed},
+        "latency": dict(_latency([ms for _, ms in samples]), by_action={
+            action: _latency(values) for action, values in sorted(by_action.items())}),
+        "lock_waits": dict(count=len(lock_waits), total_ms=sum(lock_waits),
+                           waits_over_1ms=sum(w > 1 for w in lock_waits),
+                           p50_ms=_percentile(lock_waits, 0.50), p99_ms=_percentile(lock_waits, 0.99),
+                           max_ms=max(lock_waits) if lock_waits else None),
+        # ru_maxrss is KiB on Linux. With processes this is the largest session process.
+        "peak_rss_mb": peak_rss_kib / 1024,
+        "cache": cache.stats() if mode == "thread" else None,
+        "writer": writer.stats() if mode == "thread" else None,
+    }
+
+
+def _print_summary(report):
+    latency = report["latency"]
+    print(f"{report['sessions']} {report['mode']} session(s), {report['actions']} actions in "
+          f"{report['elapsed_s']:.1f}s: {report['throughput']['actions_per_s']:.1f} actions/s, "
+          f"{report['throughput']['reruns_per_s']:.1f} reruns/s", file=sys.stderr)
+    print(f"{'action':20} {'reruns':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}", file=sys.stderr)
+    for action, stats in list(latency["by_action"].items()) + [("all", latency)]:
+        print(f"{action:20} {stats['reruns']:7d} {stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f} "
+              f"{stats['p99_ms']:9.1f}", file=sys.stderr)
+    waits = report["lock_waits"]
+    print(f"lock waits: {waits['count']} transactions, {waits['waits_over_1ms']} waited >1ms, "
+          f"max {waits['max_ms'] or 0:.1f}ms • errors: {report['errors']} "
+          f"({report['locked_errors']} locked) • peak RSS {report['peak_rss_mb']:.0f} MB", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the app with concurrent simulated sessions.")
+    parser.add_argument("--db", help="existing database to load-test (default: generate one)")
+    parser.add_argument("--rows", type=int, default=10000, help="rows to generate when --db is not given")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--mode", choices=["process", "thread"], default="process")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run (0: until --actions)")
+    parser.add_argument("--actions", type=int, help="stop each session after this many actions")
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+    if not args.duration and not args.actions:
+        parser.error("give --duration or --actions")
+
+    try:
+        import streamlit.testing.v1  # noqa: F401
+    except ImportError:
+        raise SystemExit("the load test drives the app through streamlit's AppTest; install streamlit")
+
+    if args.db:
+        db.configure(args.db)
+        from hms import migrations
+        migrations.migrate()
+    else:
+        synth.generate(f"bench_{args.rows}.db", args.rows, args.seed)
+    # The page script (and any session process) reads its database path from the environment.
+    os.environ["HMS_DB_FILE"] = db.DB_FILE
+
+    _, sizes = _targets()
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "db_file": db.DB_FILE,
+            "table_rows": sizes,
+            "weights": WEIGHTS,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": run(args.sessions, args.mode, args.duration, args.actions, args.seed),
+    }
+    _print_summary(report["results"])
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# benchmarks/run.py - Time the data-access helpers and full page reruns
+#
+#   python -m benchmarks.run --rows 100000 --out results.json
+#   python -m benchmarks.run --db bench.db --compare results.json
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+from hms import cache, db, pagination
+from hms.crud import delete_record, get_data, get_record, insert_record, search_records, update_record
+from hms.schema import PRIMARY_KEYS
+
+from benchmarks import synth
+
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Hospital_management.py")
+PAGES = ["🏠 Home", "👥 Patients", "🧑 Patient 360", "👨‍⚕️ Doctors", "🗓️ Appointments", "📋 Medical Records",
+         "💰 Billings", "💹 Billing Analytics", "📑 Reports", "📈 Performance"]
+SEARCHES = [("Patients", "name", "smi"), ("Doctors", "name", "cardio"),
+            ("MedicalRecords", "diagnosis", "hyper"), ("Billings", "details", "mri"),
+            ("Appointments", "app_date", "2024-05")]
+REGRESSION_RATIO = 1.25
+
+
+def _summarize(name, samples, **extra):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[min(len(samples_ms) - 1, int(round(0.95 * (len(samples_ms) - 1))))]
+    return dict(name=name, iterations=len(samples_ms), min_ms=samples_ms[0],
+                median_ms=statistics.median(samples_ms), p95_ms=p95,
+                mean_ms=statistics.fmean(samples_ms), **extra)
+
+
+def _time(fn, iterations, cold=False):
+    samples = []
+    for i in range(iterations):
+        if cold:
+            cache.clear()
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_helpers(iterations, sizes, rng):
+    results = []
+    for table in PRIMARY_KEYS:
+        # Full-table reads are only worth a few samples on large tables.
+        n = max(1, min(iterations, 5))
+        results.append(_summarize(f"get_data[{table}]", _time(lambda i: get_data(table), n, cold=True),
+                                  cache="cold"))
+        results.append(_summarize(f"get_data[{table}]", _time(lambda i: get_data(table), iterations),
+                                  cache="warm"))
+
+        pk = PRIMARY_KEYS[table]
+        ids = [rng.randint(1, sizes[table]) for _ in range(iterations)]
+        results.append(_summarize(f"get_record[{table}]",
+                                  _time(lambda i: get_record(table, pk, ids[i]), iterations, cold=True),
+                                  cache="cold"))
+        results.append(_summarize(f"fetch_page[{table}]",
+                                  _time(lambda i: pagination.fetch_page(table, page_size=50), iterations,
+                                        cold=True), cache="cold"))
+
+    for table, column, query in SEARCHES:
+        results.append(_summarize(f"search_records[{table}:{query}]",
+                                  _time(lambda i: search_records(table, column, query), iterations, cold=True),
+                                  cache="cold"))
+
+    fields = ["name", "age", "gender", "phone", "address", "email"]
+    new_ids = []
+    results.append(_summarize("insert_record[Patients]", _time(
+        lambda i: new_ids.append(insert_record("Patients", fields,
+                                               [f"Bench {i}", 40, "Other", f"555-{i:07d}", "x", "b@x.org"])),
+        iterations)))
+    results.append(_summarize("update_record[Patients]", _time(
+        lambda i: update_record("Patients", "pat_id", new_ids[i], ["age"], [41]), iterations)))
+    results.append(_summarize("delete_record[Patients]", _time(
+        lambda i: delete_record("Patients", "pat_id", new_ids[i]), iterations)))
+    return results
+
+
+def bench_pages(iterations):
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("streamlit not installed; skipping page reruns", file=sys.stderr)
+        return []
+    results = []
+    at = AppTest.from_file(APP_SCRIPT, default_timeout=120).run()
+    for page in PAGES:
+        def rerun(i):
+            at.sidebar.radio[0].set_value(page).run()
+            if at.exception:
+                raise RuntimeError(f"{page}: {at.exception[0].message}")
+        results.append(_summarize(f"page[{page}]", _time(rerun, 1, cold=True), cache="cold"))
+        results.append(_summarize(f"page[{page}]", _time(rerun, iterations), cache="warm"))
+    return results
+
+
+def _key(result):
+    return result["name"], result.get("cache")
+
+
+def compare(results, baseline_path, ratio=REGRESSION_RATIO):
+    # Prints median deltas against a previous results file to stderr (stdout
+    # may be the JSON report) and returns the names that slowed down by more
+    # than `ratio`.
+    with open(baseline_path) as f:
+        baseline = {_key(r): r for r in json.load(f)["results"]}
+    regressions = []
+    print(f"{'benchmark':55} {'base ms':>10} {'now ms':>10} {'ratio':>7}", file=sys.stderr)
+    for result in results:
+        old = baseline.get(_key(result))
+        if old is None:
+            continue
+        change = result["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        flag = "  <-- regression" if change > ratio else ""
+        label = result["name"] + (f" ({result['cache']})" if result.get("cache") else "")
+        print(f"{label:55} {old['median_ms']:10.3f} {result['median_ms']:10.3f} {change:7.2f}{flag}", file=sys.stderr)
+        if change > ratio:
+            regressions.append(label)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hospital data-access helpers.")
+    parser.add_argument("--db", help="existing database to benchmark (default: generate one)")
+    parser.add_argument("--rows", type=int, default=10000, help="rows to generate when --db is not given")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-pages", action="store_true", help="skip Streamlit AppTest page reruns")
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="previous JSON results to compare medians against")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        db.configure(args.db)
+        sizes = {t: db.fetch_one(f"SELECT MAX({pk}) FROM {t}")[0] or 0 for t, pk in PRIMARY_KEYS.items()}
+    else:
+        path = f"bench_{args.rows}.db"
+        sizes = synth.generate(path, args.rows, args.seed)
+    # The page script reads its database path from the environment.
+    os.environ["HMS_DB_FILE"] = db.DB_FILE
+
+    rng = random.Random(args.seed)
+    results = bench_helpers(args.iterations, sizes, rng)
+    if not args.no_pages:
+        results += bench_pages(args.iterations)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "db_file": db.DB_FILE,
+            "table_rows": sizes,
+            "iterations": args.iterations,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        regressions = compare(results, args.compare)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
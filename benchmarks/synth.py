@@ -0,0 +1,137 @@
+# benchmarks/synth.py - Generate a realistic synthetic hospital.db
+#
+#   python -m benchmarks.synth --rows 100000 --out bench.db
+import argparse
+import datetime
+import os
+import random
+
+from hms import archive, db, migrations
+
+# Share of the requested total row count that goes into each table.
+TABLE_SHARES = {
+    "Doctors": 0.01,
+    "Patients": 0.20,
+    "Appointments": 0.35,
+    "MedicalRecords": 0.24,
+    "Billings": 0.20,
+}
+BATCH_SIZE = 50000
+# Share of records and bills left for the insert trigger to date.
+STAMPED_BY_TRIGGER = 0.05
+
+FIRST_NAMES = ["James", "Mary", "Ahmed", "Fatima", "Wei", "Li", "Carlos", "Maria", "John", "Aisha",
+               "David", "Sara", "Omar", "Elena", "Raj", "Priya", "Michael", "Yuki", "Ali", "Grace"]
+LAST_NAMES = ["Smith", "Khan", "Chen", "Garcia", "Johnson", "Patel", "Kim", "Nguyen", "Ali", "Brown",
+              "Lopez", "Wilson", "Hassan", "Tanaka", "Silva", "Müller", "Rossi", "Ivanova", "Okafor", "Cohen"]
+SPECIALTIES = ["Cardiology", "Neurology", "Pediatrics", "Orthopedics", "Dermatology", "Oncology",
+               "Radiology", "Psychiatry", "General Medicine", "Gynecology", "Urology", "ENT"]
+DIAGNOSES = ["Hypertension", "Type 2 diabetes", "Asthma", "Migraine", "Influenza", "Bronchitis",
+             "Fractured wrist", "Eczema", "Anxiety disorder", "Anemia", "Gastritis", "Back pain",
+             "Urinary tract infection", "Otitis media", "Pneumonia", "Hypothyroidism"]
+TREATMENTS = ["Rest and hydration", "Physiotherapy", "Lifestyle changes", "Surgery scheduled",
+              "Follow-up in two weeks", "Referral to specialist", "Cast applied", "Counselling"]
+DRUGS = ["Amoxicillin 500mg", "Metformin 850mg", "Lisinopril 10mg", "Ibuprofen 400mg",
+         "Salbutamol inhaler", "Levothyroxine 50mcg", "Omeprazole 20mg", "Sertraline 50mg"]
+BILL_ITEMS = ["Consultation", "Lab tests", "X-ray", "MRI scan", "Surgery", "Pharmacy", "Ward stay",
+              "Physiotherapy session", "Emergency visit", "Vaccination"]
+
+
+def table_sizes(rows):
+    return {table: max(1, int(rows * share)) for table, share in TABLE_SHARES.items()}
+
+
+def _patients(rng, n):
+    for i in range(n):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield (f"{first} {last}", rng.randint(0, 100), rng.choice(["Male", "Female", "Other"]),
+               f"555-{rng.randint(0, 9999999):07d}", f"{rng.randint(1, 999)} Main St",
+               f"{first.lower()}.{last.lower()}{i}@example.com")
+
+
+def _doctors(rng, n):
+    for i in range(n):
+        yield (f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", rng.choice(SPECIALTIES),
+               rng.randint(1, 20), f"555-{rng.randint(0, 9999999):07d}", f"doctor{i}@hospital.org")
+
+
+def _appointments(rng, n, patients, doctors, today):
+    for _ in range(n):
+        day = today - datetime.timedelta(days=rng.randint(-60, 3 * 365))
+        slot = datetime.time(9 + rng.randint(0, 7), rng.choice([0, 30]))
+        status = "Scheduled" if day >= today else rng.choices(["Completed", "Cancelled"], [9, 1])[0]
+        yield (rng.randint(1, patients), rng.randint(1, doctors), str(day), str(slot), status)
+
+
+def _stamp(rng, today):
+    # Some rows are inserted undated, so the stamping triggers run as they
+    # do for rows added through the app.
+    if rng.random() < STAMPED_BY_TRIGGER:
+        return None
+    return str(today - datetime.timedelta(days=rng.randint(0, 3 * 365)))
+
+
+def _records(rng, n, patients, doctors, today):
+    for _ in range(n):
+        yield (rng.randint(1, patients), rng.randint(1, doctors), rng.choice(DIAGNOSES),
+               rng.choice(TREATMENTS), rng.choice(DRUGS), _stamp(rng, today))
+
+
+def _bills(rng, n, patients, today):
+    for _ in range(n):
+        yield (rng.randint(1, patients), round(rng.uniform(20, 5000), 2),
+               ", ".join(rng.sample(BILL_ITEMS, rng.randint(1, 3))),
+               rng.choices(["Paid", "Pending", "Overdue"], [7, 2, 1])[0], _stamp(rng, today))
+
+
+def _insert(sql, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.executemany(sql, batch)
+            batch = []
+    if batch:
+        db.executemany(sql, batch)
+
+
+def generate(path, rows, seed=0, today=None):
+    # Creates (or overwrites) `path` and leaves the data layer pointed at it.
+    for name in (path, archive.archive_file(path)):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(name + suffix):
+                os.remove(name + suffix)
+    db.close_all()
+    db.configure(path)
+    migrations.migrate()
+
+    rng = random.Random(seed)
+    today = today or datetime.date.today()
+    sizes = table_sizes(rows)
+    _insert("INSERT INTO Doctors (name, specialty, dept_id, phone, email) VALUES (?, ?, ?, ?, ?)",
+            _doctors(rng, sizes["Doctors"]))
+    _insert("INSERT INTO Patients (name, age, gender, phone, address, email) VALUES (?, ?, ?, ?, ?, ?)",
+            _patients(rng, sizes["Patients"]))
+    _insert("INSERT INTO Appointments (pat_id, doc_id, app_date, app_time, status) VALUES (?, ?, ?, ?, ?)",
+            _appointments(rng, sizes["Appointments"], sizes["Patients"], sizes["Doctors"], today))
+    _insert("INSERT INTO MedicalRecords (pat_id, doc_id, diagnosis, treatment, prescription, recorded_on) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            _records(rng, sizes["MedicalRecords"], sizes["Patients"], sizes["Doctors"], today))
+    _insert("INSERT INTO Billings (pat_id, amount, details, payment_status, billed_on) VALUES (?, ?, ?, ?, ?)",
+            _bills(rng, sizes["Billings"], sizes["Patients"], today))
+    db.fetch_one("PRAGMA optimize")
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic hospital database.")
+    parser.add_argument("--rows", type=int, default=10000, help="total rows across all tables")
+    parser.add_argument("--out", default="bench.db")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    sizes = generate(args.out, args.rows, args.seed)
+    print(f"Wrote {args.out}: " + ", ".join(f"{t}={n}" for t, n in sizes.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+# components.py - Reusable Streamlit widgets for the Hospital Management System
+import datetime
+import functools
+import math
+
+import pandas as pd
+import streamlit as st
+
+from hms import (archive, batch_edit, billing, bulk_import, cache, export, frames, pagination, profiling,
+                 scheduling, snapshot, timeline, writer)
+from hms.crud import delete_record, search_records
+from hms.schema import DETAIL_VIEWS, PRIMARY_KEYS, table_columns
+
+
+def fragment(name):
+    # st.fragment plus a profiling timer, so fragment-only reruns (which skip
+    # the page-level timer) still show up on the Performance page.
+    def decorator(fn):
+        @st.fragment
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            timer = profiling.Timer("fragment", name)
+            try:
+                fn(*args, **kwargs)
+            finally:
+                timer.stop()   # also when fn ends with st.rerun(), which raises
+        return wrapper
+    return decorator
+
+
+@fragment("delete")
+def delete_panel(table_name, id_column, noun):
+    st.subheader(f"🗑️ Delete {noun}")
+    del_id = st.number_input(f"{noun} ID to Delete", min_value=1, step=1)
+    if st.button(f"Delete {noun}", type="primary"):
+        if not delete_record(table_name, id_column, del_id):
+            st.error(f"{noun} ID {del_id} not found.")
+            return
+        st.success(f"{noun} deleted successfully!")
+        st.rerun()
+
+
+def paginated_table(table_name, key, empty_message="No rows found.", page_sizes=(25, 50, 100, 500),
+                    editable=False):
+    # Read-only browsing uses the detail view (names joined in SQL); the
+    # editable grid needs the plain table columns.
+    source = table_name if editable else DETAIL_VIEWS.get(table_name, table_name)
+    pk = PRIMARY_KEYS[table_name]
+    columns = table_columns(source)
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        sort_column = st.selectbox("Sort by", columns, index=columns.index(pk), key=f"{key}_sort")
+    with col2:
+        page_size = st.selectbox("Rows per page", page_sizes, key=f"{key}_page_size")
+    with col3:
+        descending = st.toggle("Newest first" if sort_column == pk else "Descending", key=f"{key}_desc")
+        # Archived rows are read-only, so the editable grid stays on the hot table.
+        include_archive = False
+        if table_name in archive.RULES and not editable:
+            include_archive = st.toggle("Include archive", key=f"{key}_archive")
+
+    # The stack holds the cursor each visited page started from, so "Previous"
+    # is a pop and never needs an OFFSET scan. Any change of source, ordering
+    # or page size invalidates it.
+    view = (source, sort_column, page_size, descending, include_archive)
+    if st.session_state.get(f"{key}_view") != view:
+        st.session_state[f"{key}_view"] = view
+        st.session_state[f"{key}_cursors"] = [None]
+    cursors = st.session_state[f"{key}_cursors"]
+
+    page = pagination.fetch_page(source, sort_column, page_size, cursors[-1], descending, include_archive)
+    if page.rows.empty and len(cursors) == 1:
+        st.info(empty_message)
+        return
+    if editable:
+        editable_grid(table_name, page.rows, key)
+    else:
+        st.dataframe(page.rows, use_container_width=True, hide_index=True)
+
+    total = pagination.estimate_count(source, include_archive)
+    nav1, nav2, nav3 = st.columns([1, 2, 1])
+    with nav1:
+        st.button("⬅️ Previous", key=f"{key}_prev", disabled=len(cursors) == 1,
+                  on_click=cursors.pop)
+    with nav2:
+        st.caption(f"Page {len(cursors)} of ~{max(1, math.ceil(total / page_size))} • ~{total} rows")
+    with nav3:
+        st.button("Next ➡️", key=f"{key}_next", disabled=page.next_cursor is None,
+                  on_click=cursors.append, args=(page.next_cursor,))
+
+
+def editable_grid(table_name, df, key):
+    # The editor widget key carries a version so a successful save (or a
+    # reload after a conflict) starts from a fresh, unedited grid.
+    version_key = f"{key}_editor_version"
+    editor_key = f"{key}_editor_{st.session_state.setdefault(version_key, 0)}"
+    st.data_editor(df, key=editor_key, num_rows="dynamic", disabled=[PRIMARY_KEYS[table_name]],
+                   use_container_width=True, hide_index=True)
+    changes = st.session_state[editor_key]
+    pending = len(changes["edited_rows"]) + len(changes["added_rows"]) + len(changes["deleted_rows"])
+
+    def reset():
+        st.session_state[version_key] += 1
+
+    col1, col2 = st.columns(2)
+    with col1:
+        save = st.button(f"💾 Save {pending} change(s)", key=f"{key}_save", type="primary", disabled=not pending)
+    with col2:
+        st.button("↩️ Discard changes", key=f"{key}_discard", disabled=not pending, on_click=reset)
+    if save:
+        try:
+            result = batch_edit.apply_changes(table_name, df, changes["edited_rows"],
+                                              changes["added_rows"], changes["deleted_rows"])
+        except ValueError as e:
+            st.error(f"⛔ {e}")
+            if isinstance(e, batch_edit.EditConflict):
+                st.button("🔄 Reload latest data", key=f"{key}_reload", on_click=reset)
+        else:
+            reset()
+            st.success(f"Saved: {result['updated']} updated, {result['inserted']} added, "
+                       f"{result['deleted']} deleted.")
+            st.rerun()
+
+
+def bulk_import_tab(table_name, key):
+    spec = bulk_import.IMPORT_SPECS[table_name]
+    st.subheader(f"📥 Bulk Import {table_name}")
+    st.caption(f"Columns: {', '.join(spec['columns'])} • Required: {', '.join(spec['required'])}")
+    uploaded = st.file_uploader("Upload CSV or Excel file", type=["csv", "xlsx", "xls"], key=f"{key}_upload")
+    if uploaded is None:
+        return
+
+    if st.button("📥 Start Import", key=f"{key}_import", type="primary"):
+        bar = st.progress(0.0, text="Importing...")
+        try:
+            result = bulk_import.import_file(table_name, uploaded, uploaded.name,
+                                             progress=lambda done: bar.progress(done, text="Importing..."))
+        except ValueError as e:
+            st.error(str(e))
+            return
+        bar.progress(1.0, text="Done")
+        st.success(f"Imported {result.inserted} row(s) into {table_name}! 🎉")
+        if not result.rejected.empty:
+            st.warning(f"{len(result.rejected)} row(s) were rejected.")
+            st.dataframe(result.rejected, use_container_width=True)
+            st.download_button("⬇️ Download rejected rows", result.rejected.to_csv(index=False),
+                               file_name=f"{table_name.lower()}_rejected.csv", mime="text/csv",
+                               key=f"{key}_rejected")
+
+
+def export_panel(table_name, key):
+    allowed = export.EXPORT_FILTERS[table_name]
+    filters = {}
+    with st.expander("⬇️ Export"):
+        cols = st.columns(3)
+        if "date_range" in allowed:
+            with cols[0]:
+                dates = st.date_input("Date range", value=(), key=f"{key}_export_dates")
+            if len(dates) == 2:
+                filters["date_from"], filters["date_to"] = dates
+        if "doc_id" in allowed:
+            with cols[1]:
+                filters["doc_id"] = st.number_input("Doctor ID (0 = all)", min_value=0, step=1,
+                                                    key=f"{key}_export_doc")
+        if "status" in allowed:
+            with cols[2]:
+                filters["status"] = st.selectbox("Status", ["", "Scheduled", "Completed", "Cancelled"],
+                                                 format_func=lambda s: s or "All", key=f"{key}_export_status")
+        if "payment_status" in allowed:
+            with cols[2]:
+                filters["payment_status"] = st.selectbox("Payment Status", ["", "Pending", "Paid", "Overdue"],
+                                                         format_func=lambda s: s or "All",
+                                                         key=f"{key}_export_payment")
+        fmt = st.radio("Format", ["csv", "parquet"], horizontal=True, key=f"{key}_export_fmt",
+                       format_func=str.upper)
+        # The export runs only when the button is clicked, streaming rows from
+        # SQLite chunk by chunk instead of through a DataFrame of the table.
+        st.download_button(f"⬇️ Download {table_name}",
+                           data=lambda: export.export_table(table_name, fmt, filters),
+                           file_name=export.export_filename(table_name, fmt),
+                           mime="text/csv" if fmt == "csv" else "application/vnd.apache.parquet",
+                           key=f"{key}_export", on_click="ignore")
+
+
+def show_slot_conflict(conflict):
+    st.error(f"⛔ {conflict}")
+    start = datetime.datetime.combine(conflict.app_date, conflict.app_time)
+    slots = scheduling.next_available_slots(doc_id=conflict.doc_id, start=start, count=3)
+    if slots:
+        st.info("Next free slots for this doctor: " +
+                ", ".join(f"{day} {slot_time:%H:%M}" for _, day, slot_time in slots))
+
+
+def free_slot_finder(key):
+    st.subheader("🔎 Find Free Slots")
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        mode = st.radio("Search by", ["Doctor", "Specialty"], key=f"{key}_slot_mode")
+    with col2:
+        if mode == "Doctor":
+            doc_id = st.number_input("Doctor ID", min_value=1, step=1, key=f"{key}_slot_doc")
+            specialty = None
+        else:
+            doc_id = None
+            specialty = st.text_input("Specialty (e.g., Cardiology)", key=f"{key}_slot_specialty")
+    with col3:
+        count = st.number_input("Show", min_value=1, max_value=50, value=5, key=f"{key}_slot_count")
+
+    if st.button("🔎 Find Slots", key=f"{key}_slot_find"):
+        if mode == "Specialty" and not specialty:
+            st.error("Enter a specialty to search.")
+            return
+        slots = scheduling.next_available_slots(doc_id=doc_id, specialty=specialty, count=count)
+        if not slots:
+            st.info(f"No free slots in the next {scheduling.SEARCH_DAYS} days.")
+        else:
+            st.dataframe(pd.DataFrame(slots, columns=["Doctor ID", "Date", "Time"]),
+                         use_container_width=True, hide_index=True)
+
+
+def performance_dashboard():
+    if not profiling.ENABLED:
+        st.warning("Profiling is disabled (HMS_PROFILING=0).")
+        return
+    stats = cache.stats()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Buffered Events", len(profiling.events()))
+    with col2:
+        st.metric("Slow Queries", len(profiling.slow_queries()), help=f"≥ {profiling.SLOW_QUERY_MS:.0f} ms")
+    with col3:
+        st.metric("Cache Hit Rate", f"{stats['hit_rate']:.0%}")
+    with col4:
+        st.button("🧹 Clear Measurements", on_click=profiling.clear)
+
+    writes = writer.stats()
+    st.caption(f"✍️ Writer: {writes['jobs']} writes in {writes['batches']} commits "
+               f"(mean batch {writes['mean_batch']:.1f}, largest {writes['largest_batch']}) • "
+               f"{writes['failed']} failed • {writes['queued']} queued")
+
+    st.subheader("⏱️ Page Reruns")
+    st.caption("render_ms is the rerun time not spent in SQLite or DataFrame conversion.")
+    pages = profiling.summary("page")
+    if pages.empty:
+        st.info("No page reruns recorded yet.")
+    else:
+        st.dataframe(pages.round(2), use_container_width=True, hide_index=True)
+
+    st.subheader("🧩 Fragment Reruns")
+    fragments = profiling.summary("fragment")
+    if fragments.empty:
+        st.info("No fragment reruns recorded yet.")
+    else:
+        st.dataframe(fragments.round(2), use_container_width=True, hide_index=True)
+
+    st.subheader("🗄️ Queries")
+    queries = profiling.summary("query")
+    if queries.empty:
+        st.info("No queries recorded yet.")
+    else:
+        st.dataframe(queries.round(2), use_container_width=True, hide_index=True)
+
+    st.subheader("🐢 Slow Query Log")
+    slow = profiling.slow_queries()
+    if not slow:
+        st.info("No slow queries. 🎉")
+    else:
+        log = pd.DataFrame(slow).drop(columns=["kind"]).assign(
+            ts=lambda d: pd.to_datetime(d["ts"], unit="s"), params=lambda d: d["params"].astype(str))
+        st.dataframe(log.round(2),
+                     use_container_width=True, hide_index=True)
+        picked = st.selectbox("Explain query", range(len(slow)),
+                              format_func=lambda i: f"{slow[i]['duration_ms']:.0f} ms • {slow[i]['name'][:100]}")
+        try:
+            st.code("\n".join(profiling.explain(slow[picked]["name"], slow[picked]["params"])), language="text")
+        except Exception as e:
+            st.error(f"Could not explain this query: {e}")
+
+    st.caption(f"JSON-lines sink: {profiling.LOG_FILE or 'disabled (set HMS_PROFILE_LOG)'}")
+
+
+def billing_analytics():
+    totals = billing.status_totals().set_index("payment_status")
+    amount = totals["total_amount"]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Revenue Collected", f"${amount.get('Paid', 0):,.2f}")
+    with col2:
+        st.metric("Outstanding", f"${amount.reindex(list(billing.OUTSTANDING_STATUSES)).sum():,.2f}")
+    with col3:
+        st.metric("Overdue", f"${amount.get('Overdue', 0):,.2f}")
+    with col4:
+        st.metric("Bills", int(totals["bill_count"].sum()))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("💵 Revenue by Status")
+        if totals.empty:
+            st.info("No bills yet.")
+        else:
+            st.bar_chart(amount)
+    with col2:
+        st.subheader("⏳ Overdue Aging")
+        aging = billing.overdue_aging(datetime.date.today())
+        if aging.empty:
+            st.info("No overdue bills. 🎉")
+        else:
+            st.dataframe(aging, use_container_width=True, hide_index=True)
+
+    st.subheader("📅 Daily Billing")
+    date_from, date_to = billing.default_window()
+    window = st.date_input("Date range", value=(date_from, date_to), key="billing_window")
+    if len(window) == 2:
+        daily = billing.daily_revenue(billing.bills_in_window(*window))
+        if daily.empty:
+            st.info("No dated bills in this range.")
+        else:
+            st.area_chart(daily)
+
+    st.subheader("🧾 Largest Outstanding Balances")
+    top = billing.top_outstanding()
+    if top.empty:
+        st.info("No outstanding balances.")
+    else:
+        st.dataframe(top, use_container_width=True, hide_index=True)
+
+
+def reports_dashboard():
+    # Everything below reads the Parquet snapshot, never hospital.db; only
+    # the refresh button touches the live database.
+    manifest = snapshot.load_manifest()
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        if manifest:
+            rows = {table: sum(state["rows"].values()) for table, state in manifest["tables"].items()}
+            st.caption(f"Snapshot taken {manifest['taken_at']} • "
+                       + " • ".join(f"{table}: {count}" for table, count in rows.items()))
+        else:
+            st.caption("No snapshot yet.")
+    with col2:
+        if st.button("🔄 Refresh snapshot", key="snapshot_refresh"):
+            with st.spinner("Exporting changed rows..."):
+                rewritten = snapshot.refresh()
+            st.toast(f"{sum(rewritten.values())} part(s) rewritten")
+            st.rerun()
+    if not manifest:
+        st.info("Refresh the snapshot to build the reports.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("🩺 Appointments by Specialty")
+        st.bar_chart(snapshot.appointments_by_specialty().drop(columns="total"))
+    with col2:
+        st.subheader("💵 Revenue per Quarter")
+        st.bar_chart(snapshot.revenue_per_quarter())
+
+    st.subheader("📅 Appointments per Month")
+    st.line_chart(snapshot.appointments_per_month())
+
+    st.subheader("🧬 Most Frequent Diagnoses")
+    st.dataframe(snapshot.diagnosis_counts(), use_container_width=True, hide_index=True)
+
+    with st.expander("🦆 Ad-hoc SQL (DuckDB)"):
+        query = st.text_area("Query", "SELECT specialty, COUNT(*) AS doctors FROM Doctors GROUP BY 1",
+                             key="snapshot_sql")
+        if st.button("Run", key="snapshot_sql_run"):
+            try:
+                st.dataframe(snapshot.sql(query), use_container_width=True, hide_index=True)
+            except Exception as e:
+                st.error(str(e))
+
+
+TIMELINE_ICONS = {"appointment": "🗓️", "record": "📋", "bill": "💰"}
+
+
+def patient_360():
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        query = st.text_input("🔍 Find patient by name, phone or email", key="p360_query")
+    pat_id = None
+    if query:
+        hits = search_records("Patients", "name", query)
+        if hits.empty:
+            st.info("😔 No patients found.")
+        else:
+            labels = {int(row.pat_id): f"#{row.pat_id} {row.name} ({row.phone or 'no phone'})"
+                      for row in frames.plain(hits).itertuples()}
+            pat_id = st.selectbox("Patient", list(labels), format_func=labels.get, key="p360_hit")
+    with col2:
+        typed_id = st.number_input("…or Patient ID", min_value=0, step=1, key="p360_id")
+        include_archive = st.toggle("Include archive", key="p360_archive")
+    pat_id = pat_id or typed_id or None
+    if pat_id is None:
+        st.info("Search for a patient or enter an ID.")
+        return
+    _patient_timeline(int(pat_id), include_archive)
+
+
+@fragment("Patient 360: timeline")
+def _patient_timeline(pat_id, include_archive):
+    # Pages already shown stay in session_state as cursors; "Load older"
+    # fetches one more page and the earlier ones come from the cache.
+    view = (pat_id, include_archive)
+    if st.session_state.get("p360_view") != view:
+        st.session_state["p360_view"] = view
+        st.session_state["p360_cursors"] = [None]
+    cursors = st.session_state["p360_cursors"]
+
+    summary, entries, next_cursor = timeline.load(pat_id, tuple(cursors), include_archive)
+    if summary is None:
+        st.error("Patient ID not found.")
+        return
+    summary = frames.plain(summary)
+    st.subheader(f"👤 {summary['name']}")
+    st.caption(f"#{pat_id} • {summary['age'] or '?'} y • {summary['gender'] or '—'} • "
+               f"📞 {summary['phone'] or '—'} • ✉️ {summary['email'] or '—'}")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Appointments", int(summary["appointments"]))
+    with col2:
+        st.metric("Medical Records", int(summary["records"]))
+    with col3:
+        st.metric("Bills", int(summary["bills"]))
+    with col4:
+        st.metric("Outstanding", f"${summary['outstanding']:,.2f}")
+
+    if entries.empty:
+        st.info("No history for this patient yet.")
+        return
+    shown = pd.DataFrame({
+        "When": entries["ts"].str.replace("T", " ").replace("", "Undated"),
+        "": entries["kind"].map(TIMELINE_ICONS),
+        "Entry": entries["title"].fillna("") + " #" + entries["entry_id"].astype(str),
+        "Doctor": entries["doctor"],
+        "Status": entries["status"],
+        "Amount": entries["amount"],
+    })
+    st.dataframe(shown, use_container_width=True, hide_index=True,
+                 column_config={"Amount": st.column_config.NumberColumn(format="$%.2f")})
+    st.caption(f"{len(entries)} most recent entries")
+    st.button("⬇️ Load older", key="p360_older", disabled=next_cursor is None,
+              on_click=cursors.append, args=(next_cursor,))
@@ -0,0 +1 @@
+# hms - Data-access layer shared by the Hospital Management System pages
@@ -0,0 +1,95 @@
+# hms/analytics.py - SQL-side aggregations for the dashboard charts
+import datetime
+
+from hms import cache, db
+
+# Buckets are strftime formats applied to app_date; the coarsest one that
+# keeps a chart under MAX_POINTS points is picked automatically.
+BUCKETS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-W%W",
+    "month": "%Y-%m",
+}
+MAX_POINTS = 400
+
+
+def pick_bucket(date_from, date_to):
+    days = (date_to - date_from).days + 1
+    if days <= MAX_POINTS:
+        return "day"
+    if days / 7 <= MAX_POINTS:
+        return "week"
+    return "month"
+
+
+# statuses is a tuple so the filter set can key the cache.
+def _appointment_filters(date_from, date_to, doc_id=None, statuses=None):
+    clauses, params = ["app_date BETWEEN ? AND ?"], [str(date_from), str(date_to)]
+    if doc_id:
+        clauses.append("doc_id = ?")
+        params.append(doc_id)
+    if statuses:
+        clauses.append(f"status IN ({', '.join('?' for _ in statuses)})")
+        params += list(statuses)
+    return " AND ".join(clauses), params
+
+
+@cache.cached_query("Appointments")
+def appointments_over_time(date_from, date_to, doc_id=None, statuses=None, bucket=None):
+    bucket = bucket or pick_bucket(date_from, date_to)
+    where, params = _appointment_filters(date_from, date_to, doc_id, statuses)
+    return db.read_df(f"""
+        SELECT strftime('{BUCKETS[bucket]}', app_date) AS period, status, COUNT(*) AS appointments
+        FROM Appointments WHERE {where}
+        GROUP BY period, status ORDER BY period
+    """, params)
+
+
+@cache.cached_query("Appointments")
+def appointments_by_status(date_from, date_to, doc_id=None, statuses=None):
+    where, params = _appointment_filters(date_from, date_to, doc_id, statuses)
+    return db.read_df(f"""
+        SELECT status, COUNT(*) AS appointments FROM Appointments
+        WHERE {where} GROUP BY status ORDER BY appointments DESC
+    """, params)
+
+
+@cache.cached_query("Appointments", "Doctors")
+def appointments_by_doctor(date_from, date_to, doc_id=None, statuses=None, limit=15):
+    # Counted per doc_id first; names are joined onto the top rows only.
+    where, params = _appointment_filters(date_from, date_to, doc_id, statuses)
+    return db.read_df(f"""
+        SELECT t.doc_id, COALESCE(d.name, 'Doctor #' || t.doc_id) AS doctor, d.specialty, t.appointments
+        FROM (
+            SELECT doc_id, COUNT(*) AS appointments FROM Appointments
+            WHERE {where} GROUP BY doc_id ORDER BY appointments DESC LIMIT ?
+        ) AS t
+        LEFT JOIN Doctors d ON d.doc_id = t.doc_id
+        ORDER BY t.appointments DESC
+    """, params + [limit])
+
+
+@cache.cached_query("Patients")
+def patient_demographics():
+    # Ten-year age bands by gender, read from the (gender, age) covering index.
+    return db.read_df("""
+        SELECT CASE WHEN age IS NULL THEN 'Unknown'
+                    ELSE printf('%02d-%02d', (age / 10) * 10, (age / 10) * 10 + 9) END AS age_band,
+               COALESCE(gender, 'Unknown') AS gender, COUNT(*) AS patients
+        FROM Patients
+        GROUP BY age_band, gender ORDER BY age_band
+    """)
+
+
+@cache.cached_query("MedicalRecords")
+def diagnosis_frequencies(limit=15):
+    return db.read_df("""
+        SELECT diagnosis, COUNT(*) AS records FROM MedicalRecords
+        WHERE diagnosis IS NOT NULL AND diagnosis != ''
+        GROUP BY diagnosis ORDER BY records DESC LIMIT ?
+    """, (limit,))
+
+
+def default_window(today=None, days=90):
+    today = today or datetime.date.today()
+    return today - datetime.timedelta(days=days), today
@@ -0,0 +1,184 @@
+# hms/archive.py - Hot/cold tiering: closed, old rows move to an attached archive file
+import argparse
+import datetime
+import os
+import re
+from contextlib import contextmanager
+
+from hms import cache, db
+from hms.schema import DETAIL_VIEWS, base_table, primary_key
+
+SCHEMA = "archive"
+ARCHIVE_DAYS = int(os.environ.get("HMS_ARCHIVE_DAYS", "365"))
+BATCH_SIZE = 1000
+
+# Rows that may leave the hot tables, given the horizon date as the only
+# parameter. Bills from before billed_on existed have no date and are old by
+# definition.
+RULES = {
+    "Appointments": "status IN ('Completed', 'Cancelled') AND app_date < ?",
+    "Billings": "payment_status = 'Paid' AND (billed_on < ? OR billed_on IS NULL)",
+}
+# Archiving moves a bill, it does not void it: the running totals kept by
+# the billings_summary_* triggers (see migrations) must still count it. The
+# DELETE from the hot table subtracts each moved row, so these put the same
+# amounts back first, in the same transaction. Each takes the moved ids.
+KEEP_TOTALS = {
+    "Billings": [
+        """INSERT INTO main.BillingSummary (pat_id, payment_status, bill_count, total_amount)
+           SELECT COALESCE(pat_id, 0), COALESCE(payment_status, ''), COUNT(*), COALESCE(SUM(amount), 0)
+           FROM main.Billings WHERE bill_id IN ({marks}) GROUP BY 1, 2
+           ON CONFLICT (pat_id, payment_status) DO UPDATE SET
+               bill_count = bill_count + excluded.bill_count,
+               total_amount = total_amount + excluded.total_amount""",
+        """INSERT INTO main.BillingStatusTotals (payment_status, bill_count, total_amount)
+           SELECT COALESCE(payment_status, ''), COUNT(*), COALESCE(SUM(amount), 0)
+           FROM main.Billings WHERE bill_id IN ({marks}) GROUP BY 1
+           ON CONFLICT (payment_status) DO UPDATE SET
+               bill_count = bill_count + excluded.bill_count,
+               total_amount = total_amount + excluded.total_amount""",
+    ],
+}
+# Cold rows are only ever read by these columns. They are not in the
+# <table>_fts indexes either: ranked search (hms.search) finds hot rows only,
+# and "Include archive" on the paged tables is the way to see cold ones.
+ARCHIVE_INDEXES = {
+    "Appointments": ["pat_id", "app_date"],
+    "Billings": ["pat_id", "billed_on"],
+}
+
+
+def archive_file(main_file):
+    # hospital.db -> hospital_archive.db, next to the main database.
+    root, ext = os.path.splitext(main_file)
+    return f"{root}_archive{ext or '.db'}"
+
+
+def all_rows_view(name):
+    # TEMP view over hot + cold rows of a table or detail view, e.g. AppointmentsAll.
+    return f"{name}All"
+
+
+def source(name, include_archive=False):
+    # The relation to SELECT from; hot tables only unless asked otherwise.
+    return all_rows_view(name) if include_archive and base_table(name) in RULES else name
+
+
+def _columns(conn, schema_name, table):
+    return conn.execute(f"PRAGMA {schema_name}.table_info({table})").fetchall()
+
+
+def _sync_tables(conn):
+    # Archive tables mirror the hot columns; columns added to the hot table
+    # by later migrations are added here too. No triggers or FTS: cold rows
+    # are never written after they arrive.
+    for table in RULES:
+        hot = _columns(conn, "main", table)
+        cold = {row[1] for row in _columns(conn, SCHEMA, table)}
+        if not cold:
+            columns = ", ".join(f"{name} {type_} PRIMARY KEY" if pk else f"{name} {type_}"
+                                for _, name, type_, _, _, pk in hot)
+            conn.execute(f"CREATE TABLE {SCHEMA}.{table} ({columns})")
+        else:
+            for _, name, type_, _, _, _ in hot:
+                if name not in cold:
+                    conn.execute(f"ALTER TABLE {SCHEMA}.{table} ADD COLUMN {name} {type_}")
+        for column in ARCHIVE_INDEXES[table]:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {SCHEMA}.idx_{table.lower()}_{column} "
+                         f"ON {table}({column})")
+
+
+def _create_views(conn):
+    # TEMP views are per connection and may span schemas; main views may not.
+    # The detail views reuse their own definition with the table swapped for
+    # its hot + cold union.
+    for table in RULES:
+        names = ", ".join(row[1] for row in _columns(conn, "main", table))
+        conn.execute(f"DROP VIEW IF EXISTS temp.{all_rows_view(table)}")
+        conn.execute(f"""CREATE TEMP VIEW {all_rows_view(table)} AS
+            SELECT {names} FROM main.{table} UNION ALL SELECT {names} FROM {SCHEMA}.{table}""")
+        view = DETAIL_VIEWS.get(table)
+        sql = conn.execute("SELECT sql FROM main.sqlite_master WHERE type = 'view' AND name = ?",
+                           (view,)).fetchone()
+        if sql:
+            body = re.sub(rf"^CREATE VIEW\s+{view}\s+AS", "", sql[0], flags=re.IGNORECASE)
+            body = re.sub(rf"\bFROM\s+{table}\b", f"FROM {all_rows_view(table)}", body)
+            conn.execute(f"DROP VIEW IF EXISTS temp.{all_rows_view(view)}")
+            conn.execute(f"CREATE TEMP VIEW {all_rows_view(view)} AS {body}")
+
+
+def attach(conn):
+    # Once per pooled connection: ATTACH cannot run inside a transaction, so
+    # this happens before any BEGIN.
+    schemas = {row[1]: row[2] for row in conn.execute("PRAGMA database_list")}
+    if SCHEMA in schemas:
+        return
+    conn.execute(f"ATTACH DATABASE ? AS {SCHEMA}", (archive_file(schemas["main"]),))
+    conn.execute(f"PRAGMA {SCHEMA}.journal_mode = WAL")
+    # Under the write lock, so two connections attaching at once cannot both
+    # find a table missing and both create it.
+    with db.transaction():
+        _sync_tables(conn)
+    _create_views(conn)
+
+
+@contextmanager
+def connection():
+    # Nested db helpers on this thread reuse the connection, so they see the
+    # archive schema and the *All views.
+    with db.connection() as conn:
+        attach(conn)
+        yield conn
+
+
+def archive_old_rows(days=ARCHIVE_DAYS, today=None, batch_size=BATCH_SIZE):
+    # Moves rows in short BEGIN IMMEDIATE batches so the UI's writers are
+    # never locked out for long. With the main file in WAL mode a commit is
+    # not atomic across both files; INSERT OR REPLACE makes a re-run after a
+    # crash finish the move instead of failing on duplicates.
+    horizon = str((today or datetime.date.today()) - datetime.timedelta(days=days))
+    moved = {}
+    with connection():
+        for table, rule in RULES.items():
+            pk = primary_key(table)
+            moved[table] = 0
+            while True:
+                with db.transaction() as conn:
+                    ids = [row[0] for row in conn.execute(
+                        f"SELECT {pk} FROM main.{table} WHERE {rule} ORDER BY {pk} LIMIT ?",
+                        (horizon, batch_size))]
+                    if ids:
+                        names = ", ".join(row[1] for row in _columns(conn, "main", table))
+                        marks = ", ".join("?" for _ in ids)
+                        conn.execute(f"INSERT OR REPLACE INTO {SCHEMA}.{table} ({names}) "
+                                     f"SELECT {names} FROM main.{table} WHERE {pk} IN ({marks})", ids)
+                        for sql in KEEP_TOTALS.get(table, ()):
+                            conn.execute(sql.format(marks=marks), ids)
+                        conn.execute(f"DELETE FROM main.{table} WHERE {pk} IN ({marks})", ids)
+                if not ids:
+                    break
+                moved[table] += len(ids)
+            if moved[table]:
+                cache.bump(table)
+    return moved
+
+
+@cache.cached_query(*RULES)
+def archived_counts():
+    with connection() as conn:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {SCHEMA}.{table}").fetchone()[0]
+                for table in RULES}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move closed rows older than the horizon to the archive file.")
+    parser.add_argument("--db", default=db.DB_FILE)
+    parser.add_argument("--days", type=int, default=ARCHIVE_DAYS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    from hms import migrations
+    db.configure(args.db)
+    migrations.migrate()
+    for table, count in archive_old_rows(args.days, batch_size=args.batch_size).items():
+        print(f"{table}: {count} row(s) archived")
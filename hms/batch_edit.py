@@ -0,0 +1,116 @@
+# hms/batch_edit.py - Apply an edited grid's diff in one optimistic transaction
+import sqlite3
+
+import pandas as pd
+
+from hms import cache, db, scheduling
+from hms.schema import PRIMARY_KEYS
+
+
+class EditConflict(ValueError):
+    def __init__(self, table_name, ids):
+        super().__init__(f"{len(ids)} row(s) in {table_name} were changed or removed by someone else "
+                         f"since you loaded them: {', '.join(map(str, ids))}. Reload and try again.")
+        self.ids = ids
+
+
+def _py(value):
+    # sqlite3 cannot bind numpy scalars, and pandas reports SQL NULL as NaN/NA.
+    if value is None or (not isinstance(value, (list, tuple)) and pd.isna(value)):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+def apply_changes(table_name, original, edited_rows=None, added_rows=None, deleted_rows=None):
+    # Takes st.data_editor's change format: edited_rows {position: {column:
+    # value}}, added_rows [{column: value}], deleted_rows [position], with
+    # positions into `original`. Everything is written in one transaction; if
+    # any edited or deleted row no longer matches `original` the transaction
+    # rolls back and EditConflict lists the offending ids.
+    edited_rows, added_rows, deleted_rows = edited_rows or {}, added_rows or [], deleted_rows or []
+    pk = PRIMARY_KEYS[table_name]
+    original = original.reset_index(drop=True)
+    columns = list(original.columns)
+    data_columns = [c for c in columns if c != pk]
+
+    def original_values(position):
+        return [_py(v) for v in original.iloc[int(position)][columns]]
+
+    # Group updates by the set of columns they touch: one executemany each.
+    updates = {}
+    for position, changes in edited_rows.items():
+        if int(position) in deleted_rows:
+            continue
+        changed = tuple(sorted(c for c in changes if c in data_columns))
+        if changed:
+            updates.setdefault(changed, []).append((
+                [_py(changes[c]) for c in changed], original_values(position)))
+
+    deletes = [original_values(position) for position in deleted_rows]
+    inserts = [[_py(row.get(c)) for c in data_columns] for row in added_rows if any(
+        _py(row.get(c)) is not None for c in data_columns)]
+
+    pk_index = columns.index(pk)
+    try:
+        with db.transaction() as conn:
+            # Optimistic check: every edited or deleted row must still hold the
+            # values the grid was loaded with. BEGIN IMMEDIATE already holds
+            # the write lock, so nothing can change between check and writes.
+            touched = [old for rows in updates.values() for _, old in rows] + deletes
+            stale = _stale_ids(conn, table_name, columns, touched)
+            if stale:
+                raise EditConflict(table_name, stale)
+            for changed, rows in updates.items():
+                set_clause = ", ".join(f"{c} = ?" for c in changed)
+                conn.executemany(f"UPDATE {table_name} SET {set_clause} WHERE {pk} = ?",
+                                 [new + [old[pk_index]] for new, old in rows])
+            if deletes:
+                conn.executemany(f"DELETE FROM {table_name} WHERE {pk} = ?",
+                                 [(old[pk_index],) for old in deletes])
+            if inserts:
+                placeholders = ", ".join("?" for _ in data_columns)
+                conn.executemany(f"INSERT INTO {table_name} ({', '.join(data_columns)}) VALUES ({placeholders})",
+                                 inserts)
+            if table_name == "Appointments":
+                _check_slots(conn, updates, inserts, columns, data_columns)
+    except sqlite3.IntegrityError as e:
+        raise ValueError(f"Changes rejected by the database: {e}") from e
+    finally:
+        cache.bump(table_name)
+
+    return {"updated": sum(len(rows) for rows in updates.values()),
+            "inserted": len(inserts), "deleted": len(deletes)}
+
+
+def _stale_ids(conn, table_name, columns, originals, chunk_size=500):
+    # Ids of rows whose current values differ from `originals` (or that no
+    # longer exist), read back with one IN query per chunk.
+    pk_index = columns.index(PRIMARY_KEYS[table_name])
+    stale = []
+    for start in range(0, len(originals), chunk_size):
+        chunk = originals[start:start + chunk_size]
+        ids = [values[pk_index] for values in chunk]
+        current = {row[pk_index]: row for row in conn.execute(
+            f"SELECT {', '.join(columns)} FROM {table_name} "
+            f"WHERE {PRIMARY_KEYS[table_name]} IN ({', '.join('?' for _ in ids)})", ids)}
+        stale += [i for i, values in zip(ids, chunk) if current.get(i) != tuple(values)]
+    return sorted(set(stale))
+
+
+def _check_slots(conn, updates, inserts, columns, data_columns):
+    # Grid edits go through the same double-booking rule as the booking form.
+    # Checked after the writes so clashes inside the batch are caught too.
+    slots = set()
+    for changed, rows in updates.items():
+        for new, old in rows:
+            row = dict(zip(columns, old), **dict(zip(changed, new)))
+            slots.add((row["doc_id"], row["app_date"], row["app_time"], row["status"]))
+    for values in inserts:
+        row = dict(zip(data_columns, values))
+        slots.add((row["doc_id"], row["app_date"], row["app_time"], row["status"]))
+    for doc_id, app_date, app_time, status in slots:
+        if status in scheduling.FREE_STATUSES or not (doc_id and app_date and app_time):
+            continue
+        ids = scheduling.overlapping_ids(conn, doc_id, app_date, app_time)
+        if len(ids) > 1:
+            raise scheduling.SlotConflict(doc_id, app_date, app_time, ids[0])
@@ -0,0 +1,83 @@
+# hms/billing.py - Billing analytics over the trigger-maintained aggregates
+import datetime
+
+import pandas as pd
+
+from hms import cache, db
+
+OUTSTANDING_STATUSES = ("Pending", "Overdue")
+AGING_BUCKETS = [(0, 30, "0-30 days"), (31, 60, "31-60 days"), (61, 90, "61-90 days"), (91, None, "90+ days")]
+
+
+@cache.cached_query("Billings")
+def status_totals():
+    # One row per payment_status from BillingStatusTotals; never scans Billings.
+    return db.read_df("""
+        SELECT payment_status, bill_count, total_amount
+        FROM BillingStatusTotals WHERE bill_count > 0
+        ORDER BY total_amount DESC
+    """)
+
+
+@cache.cached_query("Billings", "Patients")
+def top_outstanding(limit=20):
+    placeholders = ", ".join("?" for _ in OUTSTANDING_STATUSES)
+    return db.read_df(f"""
+        SELECT s.pat_id, p.name AS patient_name,
+               SUM(s.bill_count) AS open_bills, SUM(s.total_amount) AS outstanding
+        FROM BillingSummary s
+        LEFT JOIN Patients p ON p.pat_id = s.pat_id
+        WHERE s.payment_status IN ({placeholders})
+        GROUP BY s.pat_id
+        ORDER BY outstanding DESC
+        LIMIT ?
+    """, (*OUTSTANDING_STATUSES, limit))
+
+
+@cache.cached_query("Billings")
+def overdue_aging(today):
+    # Bucketed in SQL over idx_billings_status_billed_on (a covering index),
+    # so only overdue bills are touched. Bills from before billed_on existed
+    # have no date and are reported as "Undated".
+    cases = []
+    params = []
+    for low, high, label in AGING_BUCKETS:
+        if high is None:
+            cases.append("WHEN billed_on <= date(?, ?) THEN ?")
+            params += [str(today), f"-{low} day", label]
+        else:
+            cases.append("WHEN billed_on BETWEEN date(?, ?) AND date(?, ?) THEN ?")
+            params += [str(today), f"-{high} day", str(today), f"-{low} day", label]
+    frame = db.read_df(f"""
+        SELECT CASE WHEN billed_on IS NULL THEN 'Undated' {' '.join(cases)} ELSE 'Future-dated' END AS bucket,
+               COUNT(*) AS bills, COALESCE(SUM(amount), 0) AS amount
+        FROM Billings
+        WHERE payment_status = 'Overdue'
+        GROUP BY bucket
+    """, params)
+    order = [label for _, _, label in AGING_BUCKETS] + ["Undated", "Future-dated"]
+    frame = frame.set_index("bucket").reindex(order).dropna(how="all").reset_index()
+    return frame.astype({"bills": int})
+
+
+@cache.cached_query("Billings")
+def bills_in_window(date_from, date_to):
+    return db.read_df("""
+        SELECT billed_on, payment_status, amount FROM Billings
+        WHERE billed_on BETWEEN ? AND ?
+    """, (str(date_from), str(date_to)))
+
+
+def daily_revenue(bills):
+    # Vectorized pivot of a bounded window: one row per day, one column per status.
+    if bills.empty:
+        return pd.DataFrame()
+    bills = bills.assign(billed_on=pd.to_datetime(bills["billed_on"]))
+    return (bills.pivot_table(index="billed_on", columns="payment_status", values="amount",
+                              aggfunc="sum", fill_value=0)
+                 .asfreq("D", fill_value=0))
+
+
+def default_window(today=None, days=90):
+    today = today or datetime.date.today()
+    return today - datetime.timedelta(days=days), today
@@ -0,0 +1,147 @@
+# hms/bulk_import.py - Streaming CSV/Excel import with batched executemany
+import datetime
+from collections import namedtuple
+
+import pandas as pd
+
+from hms import cache, db, scheduling
+
+CHUNK_SIZE = 5000   # rows parsed, validated and committed per transaction
+
+GENDERS = ["Male", "Female", "Other"]
+APPOINTMENT_STATUSES = ["Scheduled", "Completed", "Cancelled"]
+
+# Same required fields as the "Add New" forms.
+IMPORT_SPECS = {
+    "Patients": {
+        "columns": ["name", "age", "gender", "phone", "address", "email"],
+        "required": ["name", "phone", "gender"],
+        "integers": ["age"],
+    },
+    "Doctors": {
+        "columns": ["name", "specialty", "dept_id", "phone", "email"],
+        "required": ["name"],
+        "integers": ["dept_id"],
+    },
+    "Appointments": {
+        "columns": ["pat_id", "doc_id", "app_date", "app_time", "status"],
+        "required": ["pat_id", "doc_id"],
+        "integers": ["pat_id", "doc_id"],
+    },
+}
+
+ImportResult = namedtuple("ImportResult", ["inserted", "rejected"])
+
+
+def read_chunks(file, filename, chunk_size=CHUNK_SIZE):
+    # CSV is parsed incrementally. Excel has no streaming reader in pandas, so
+    # the sheet is loaded once and then processed in the same chunk size.
+    if filename.lower().endswith((".xlsx", ".xls")):
+        try:
+            frame = pd.read_excel(file, dtype=str)
+        except ImportError as e:
+            raise ValueError("Excel import needs the optional 'openpyxl' package; upload a CSV instead.") from e
+        for start in range(0, len(frame), chunk_size):
+            yield frame.iloc[start:start + chunk_size]
+    else:
+        yield from pd.read_csv(file, dtype=str, chunksize=chunk_size, skipinitialspace=True)
+
+
+def _validate(table_name, chunk):
+    # Returns (clean rows ready for executemany, the input rows they came
+    # from, rejected rows with a reason).
+    spec = IMPORT_SPECS[table_name]
+    chunk = chunk.rename(columns=lambda c: str(c).strip().lower())
+    missing = [c for c in spec["required"] if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    frame = chunk.reindex(columns=spec["columns"])
+    # read_*(dtype=str) gives `str` columns on pandas 3 and object before it.
+    frame = frame.apply(lambda col: col.str.strip() if pd.api.types.is_string_dtype(col) else col)
+    frame = frame.replace("", None)
+    reason = pd.Series("", index=frame.index)
+
+    for column in spec["required"]:
+        reason = reason.mask(frame[column].isna() & (reason == ""), f"{column} is required")
+    for column in spec["integers"]:
+        numbers = pd.to_numeric(frame[column], errors="coerce")
+        bad = frame[column].notna() & (numbers.isna() | (numbers % 1 != 0))
+        reason = reason.mask(bad & (reason == ""), f"{column} must be a whole number")
+        # Rejected rows are dropped below; cast only the whole numbers.
+        frame[column] = numbers.where(~bad).astype("Int64")
+
+    if table_name == "Patients":
+        # Blank genders were already rejected as required.
+        bad = ~frame["gender"].isin(GENDERS)
+        reason = reason.mask(bad & (reason == ""), f"gender must be one of {', '.join(GENDERS)}")
+    elif table_name == "Appointments":
+        # Store dates/times exactly as the booking form does (str(date), str(time)).
+        dates = pd.to_datetime(frame["app_date"], format="mixed", errors="coerce")
+        times = pd.to_datetime(frame["app_time"], format="mixed", errors="coerce")
+        reason = reason.mask(dates.isna() & (reason == ""), "app_date is not a valid date")
+        reason = reason.mask(frame["app_time"].notna() & times.isna() & (reason == ""),
+                             "app_time is not a valid time")
+        frame["app_date"] = dates.dt.strftime("%Y-%m-%d")
+        frame["app_time"] = times.dt.strftime("%H:%M:%S")
+        frame["status"] = frame["status"].fillna("Scheduled")
+        bad = ~frame["status"].isin(APPOINTMENT_STATUSES)
+        reason = reason.mask(bad & (reason == ""),
+                             f"status must be one of {', '.join(APPOINTMENT_STATUSES)}")
+
+    ok = reason == ""
+    clean = frame[ok].astype(object).where(frame[ok].notna(), None)
+    rejected = chunk[~ok].assign(reason=reason[~ok])
+    return list(clean.itertuples(index=False, name=None)), chunk[ok], rejected
+
+
+def _book_rows(conn, sql, rows):
+    # Appointments go in one at a time within the chunk's transaction, so
+    # each is checked for a slot conflict against the stored bookings and the
+    # earlier rows of the file, as scheduling._book does for the form. A clash
+    # skips that row instead of the chunk; returns {position: reason}.
+    conflicts = {}
+    for position, row in enumerate(rows):
+        pat_id, doc_id, app_date, app_time, status = row
+        if app_time is not None and status not in scheduling.FREE_STATUSES:
+            app_time = datetime.time.fromisoformat(app_time)
+            existing = scheduling.find_conflict(conn, doc_id, app_date, app_time)
+            if existing is not None:
+                conflicts[position] = str(scheduling.SlotConflict(doc_id, app_date, app_time, existing))
+                continue
+        conn.execute(sql, row)
+    return conflicts
+
+
+def import_file(table_name, file, filename, progress=None, chunk_size=CHUNK_SIZE):
+    # `progress(fraction)` is called after each committed chunk when the input
+    # size is known (file-like objects with getbuffer()/tell()).
+    spec = IMPORT_SPECS[table_name]
+    columns = ", ".join(spec["columns"])
+    placeholders = ", ".join("?" for _ in spec["columns"])
+    sql = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+    total_bytes = file.getbuffer().nbytes if hasattr(file, "getbuffer") else None
+
+    inserted, rejected = 0, []
+    try:
+        for chunk in read_chunks(file, filename, chunk_size):
+            rows, sources, bad = _validate(table_name, chunk)
+            if rows and table_name == "Appointments":
+                with db.transaction() as conn:
+                    conflicts = _book_rows(conn, sql, rows)
+                inserted += len(rows) - len(conflicts)
+                if conflicts:
+                    rejected.append(sources.iloc[list(conflicts)].assign(reason=list(conflicts.values())))
+            elif rows:
+                db.executemany(sql, rows)
+                inserted += len(rows)
+            if not bad.empty:
+                rejected.append(bad)
+            if progress and total_bytes:
+                progress(min(file.tell() / total_bytes, 1.0))
+    finally:
+        if inserted:
+            cache.bump(table_name)
+
+    rejected = pd.concat(rejected) if rejected else pd.DataFrame(columns=["reason"])
+    return ImportResult(inserted, rejected)
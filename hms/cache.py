@@ -0,0 +1,180 @@
+# hms/cache.py - In-process caches for read helpers
+import functools
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+import pandas as pd
+
+from hms import db
+from hms.schema import VIEW_TABLES
+
+
+def ttl_cache(seconds):
+    # Memoize on positional args for `seconds`; stale entries are recomputed on
+    # the next call. Callers that depend on the calendar day should pass the
+    # date in so the key rolls over with it.
+    def decorator(fn):
+        entries = {}
+        lock = threading.Lock()
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            now = time.monotonic()
+            hit = entries.get(args)
+            if hit is not None and now - hit[0] < seconds:
+                return hit[1]
+            value = fn(*args)
+            with lock:
+                entries[args] = (now, value)
+            return value
+
+        wrapper.cache_clear = entries.clear
+        return wrapper
+    return decorator
+
+
+# --------------------- Generation-keyed Read Cache ---------------------
+# Every table has a generation number that writers bump. Cached reads are
+# keyed on it, so a write makes all older entries for that table unreachable
+# (they then age out of the LRU) while untouched tables keep serving hits.
+# Writes from other processes are picked up by poll() below. Cached values
+# are shared between sessions and must be treated as read-only.
+CACHE_MAX_BYTES = int(os.environ.get("HMS_CACHE_MB", "64")) * 1024 * 1024
+
+_generations = defaultdict(int)
+_entries = OrderedDict()   # key -> (value, size)
+_lock = threading.RLock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0, "db_invalidations": 0}
+
+
+def generation(table_name):
+    # A view changes whenever any table it reads from does.
+    poll()
+    if table_name in VIEW_TABLES:
+        return tuple(_generations[t] for t in VIEW_TABLES[table_name])
+    return _generations[table_name]
+
+
+def bump(*table_names):
+    with _lock:
+        for table_name in table_names:
+            _generations[table_name] += 1
+
+
+# --------------------- Cross-process Invalidation ---------------------
+# Other replicas never call bump() here. One watcher connection per process
+# polls PRAGMA data_version, which moves only when another connection (in
+# any process) commits; only then is TableVersions read (one counter per
+# table, bumped by triggers, see migrations), and tables whose counter moved
+# are bumped. A quiet database costs one PRAGMA per POLL_SECONDS.
+POLL_SECONDS = float(os.environ.get("HMS_CACHE_POLL_MS", "100")) / 1000
+
+_watcher = {"path": None, "conn": None, "data_version": None, "versions": {}, "polled": 0.0}
+_poll_lock = threading.Lock()
+
+
+def poll(force=False):
+    if not force and time.monotonic() - _watcher["polled"] < POLL_SECONDS:
+        return
+    # Whoever holds the lock is already polling; the others read on.
+    if not _poll_lock.acquire(blocking=False):
+        return
+    try:
+        if _watcher["path"] != db.DB_FILE:
+            if _watcher["conn"] is not None:
+                _watcher["conn"].close()
+            _watcher.update(path=db.DB_FILE, data_version=None, versions={},
+                            conn=sqlite3.connect(db.DB_FILE, isolation_level=None, check_same_thread=False))
+        _watcher["polled"] = time.monotonic()
+        conn = _watcher["conn"]
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == _watcher["data_version"]:
+            return
+        try:
+            versions = dict(conn.execute("SELECT table_name, version FROM TableVersions"))
+        except sqlite3.OperationalError:
+            return      # not migrated yet; try again next poll
+        # With no baseline yet every table counts as changed, which drops
+        # anything cached before the first successful poll.
+        changed = [t for t, v in versions.items() if _watcher["versions"].get(t) != v]
+        _watcher.update(data_version=data_version, versions=versions)
+        if changed:
+            bump(*changed)
+            with _lock:
+                _stats["db_invalidations"] += len(changed)
+    finally:
+        _poll_lock.release()
+
+
+def _sizeof(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _store(key, value):
+    size = _sizeof(value)
+    if size > CACHE_MAX_BYTES:
+        return
+    with _lock:
+        if key in _entries:
+            _stats["bytes"] -= _entries.pop(key)[1]
+        _entries[key] = (value, size)
+        _stats["bytes"] += size
+        while _stats["bytes"] > CACHE_MAX_BYTES:
+            _, (_, evicted) = _entries.popitem(last=False)
+            _stats["bytes"] -= evicted
+            _stats["evictions"] += 1
+
+
+def _cached_call(key, fn, args, kwargs):
+    with _lock:
+        hit = _entries.get(key)
+        if hit is not None:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return hit[0]
+        _stats["misses"] += 1
+    value = fn(*args, **kwargs)
+    _store(key, value)
+    return value
+
+
+def cached_read(fn):
+    # For read helpers whose first argument is the table name.
+    @functools.wraps(fn)
+    def wrapper(table_name, *args, **kwargs):
+        key = (fn.__qualname__, table_name, generation(table_name), args, tuple(sorted(kwargs.items())))
+        return _cached_call(key, fn, (table_name,) + args, kwargs)
+    return wrapper
+
+
+def cached_query(*table_names):
+    # For reads over a fixed set of tables, e.g. cached_query("Billings", "Patients").
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (fn.__qualname__, tuple(generation(t) for t in table_names), args,
+                   tuple(sorted(kwargs.items())))
+            return _cached_call(key, fn, args, kwargs)
+        return wrapper
+    return decorator
+
+
+def stats():
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return dict(_stats, entries=len(_entries),
+                    hit_rate=_stats["hits"] / lookups if lookups else 0.0)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _stats["bytes"] = 0
@@ -0,0 +1,102 @@
+# hms/crud.py - Generic CRUD helpers used by the Streamlit pages
+from hms import archive, cache, db, search, writer
+from hms.schema import DETAIL_VIEWS
+
+
+@cache.cached_read
+def get_data(table_name, include_archive=False):
+    if include_archive:
+        with archive.connection():
+            return db.read_df(f"SELECT * FROM {archive.source(table_name, True)}")
+    return db.read_df(f"SELECT * FROM {table_name}")
+
+
+# Writes go through the writer thread (hms.writer), which group-commits them
+# with other sessions' writes. The *_async variants return its Future; the
+# plain ones wait for it. db helpers called from a write reuse the writer's
+# connection and transaction.
+def _insert(conn, table_name, fields, values):
+    placeholders = ', '.join(['?' for _ in values])
+    columns = ', '.join(fields)
+    sql = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+    return db.execute(sql, values).lastrowid
+
+
+def _delete(conn, table_name, id_column, record_id):
+    # Returns the number of rows deleted (0 or 1).
+    return db.execute(f"DELETE FROM {table_name} WHERE {id_column} = ?", (record_id,)).rowcount
+
+
+def _update(conn, table_name, id_column, record_id, fields, values):
+    set_clause = ', '.join([f"{f} = ?" for f in fields])
+    sql = f"UPDATE {table_name} SET {set_clause} WHERE {id_column} = ?"
+    db.execute(sql, [*values, record_id])
+
+
+def _insert_many(conn, table_name, rows):
+    # `rows` is [(fields, values)]. All or nothing: the rows share one
+    # savepoint in the writer's batch.
+    return [_insert(conn, table_name, fields, values) for fields, values in rows]
+
+
+def _update_many(conn, table_name, id_column, changes):
+    # `changes` is [(record_id, fields, values)]; returns the ids that matched no row.
+    missing = []
+    for record_id, fields, values in changes:
+        set_clause = ', '.join([f"{f} = ?" for f in fields])
+        cur = db.execute(f"UPDATE {table_name} SET {set_clause} WHERE {id_column} = ?", [*values, record_id])
+        if cur.rowcount == 0:
+            missing.append(record_id)
+    return missing
+
+
+def insert_record_async(table_name, fields, values):
+    return writer.submit(_insert, table_name, fields, values, tables=(table_name,))
+
+
+def delete_record_async(table_name, id_column, record_id):
+    return writer.submit(_delete, table_name, id_column, record_id, tables=(table_name,))
+
+
+def update_record_async(table_name, id_column, record_id, fields, values):
+    return writer.submit(_update, table_name, id_column, record_id, fields, values, tables=(table_name,))
+
+
+def insert_many_async(table_name, rows):
+    return writer.submit(_insert_many, table_name, rows, tables=(table_name,))
+
+
+def update_many_async(table_name, id_column, changes):
+    return writer.submit(_update_many, table_name, id_column, changes, tables=(table_name,))
+
+
+def insert_record(table_name, fields, values):
+    return insert_record_async(table_name, fields, values).result()
+
+
+def delete_record(table_name, id_column, record_id):
+    # Returns the number of rows deleted; 0 when the id does not exist.
+    return delete_record_async(table_name, id_column, record_id).result()
+
+
+def update_record(table_name, id_column, record_id, fields, values):
+    update_record_async(table_name, id_column, record_id, fields, values).result()
+
+
+def search_records(table_name, column, query, detailed=False):
+    # Cached under the relation actually read, so a detailed search is also
+    # dropped when a joined patient or doctor name changes.
+    source = DETAIL_VIEWS.get(table_name, table_name) if detailed else table_name
+    return _search_records(source, table_name, column, query)
+
+
+@cache.cached_read
+def _search_records(source, table_name, column, query):
+    if search.has_index(table_name):
+        return search.search(table_name, query, detailed=source != table_name)
+    return db.read_df(f"SELECT * FROM {source} WHERE {column} LIKE ?", (f"%{query}%",))
+
+
+@cache.cached_read
+def get_record(table_name, id_column, record_id):
+    return db.fetch_one(f"SELECT * FROM {table_name} WHERE {id_column} = ?", (record_id,))
@@ -0,0 +1,195 @@
+# hms/db.py - Pooled SQLite connections with WAL journaling and tuned pragmas
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from hms import frames, profiling
+
+DB_FILE = os.environ.get("HMS_DB_FILE", "hospital.db")
+
+# Applied to every new connection. WAL lets readers run alongside the single
+# writer, and busy_timeout makes writers wait instead of failing with
+# "database is locked".
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -32000,        # negative = KiB, i.e. ~32 MB page cache
+    "mmap_size": 268435456,      # 256 MB memory-mapped I/O
+    "busy_timeout": 5000,        # ms
+    "temp_store": "MEMORY",
+}
+
+POOL_SIZE = int(os.environ.get("HMS_POOL_SIZE", "8"))
+STATEMENT_CACHE_SIZE = 256       # prepared statements kept per connection
+
+
+class ConnectionPool:
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=PRAGMAS["busy_timeout"] / 1000,
+            isolation_level=None,            # transactions are explicit, see transaction()
+            check_same_thread=False,         # connections move between threads via the pool
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for name, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        # Re-entrant: nested helpers on the same thread share one connection,
+        # so they also share any transaction that is open on it.
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            if self._idle.qsize() < self.size:
+                self._idle.put(conn)
+            else:
+                conn.close()
+
+    def current(self):
+        # The connection this thread has checked out, if any.
+        return getattr(self._local, "conn", None)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None):
+    path = path or DB_FILE
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(path, ConnectionPool(path))
+    return pool
+
+
+def configure(db_file):
+    # Point the data layer at another database file (benchmarks, tests, tools).
+    global DB_FILE
+    DB_FILE = db_file
+
+
+def close_all():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+@contextmanager
+def connection():
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def in_transaction():
+    conn = get_pool().current()
+    return conn is not None and conn.in_transaction
+
+
+@contextmanager
+def transaction():
+    # BEGIN IMMEDIATE takes the write lock up front, so a transaction never
+    # has to upgrade from reader to writer halfway through (which in WAL mode
+    # fails immediately with SQLITE_BUSY instead of honouring busy_timeout).
+    with connection() as conn:
+        if conn.in_transaction:
+            yield conn
+            return
+        started = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        profiling.record_lock_wait(started)
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+
+# --------------------- Query Helpers ---------------------
+# Every helper reports to hms.profiling; read_df times the DataFrame
+# conversion (including the compact dtypes from hms.frames) separately from
+# the query itself.
+def read_df(sql, params=()):
+    started = time.perf_counter()
+    with connection() as conn:
+        cur = conn.execute(sql, params)
+        rows = cur.fetchall()
+        columns = [d[0] for d in cur.description]
+    converting = time.perf_counter()
+    df = frames.frame(rows, columns)
+    convert_s = time.perf_counter() - converting
+    profiling.record_query(sql, params, started, rows=rows, convert_s=convert_s)
+    return df
+
+
+def fetch_one(sql, params=()):
+    started = time.perf_counter()
+    with connection() as conn:
+        row = conn.execute(sql, params).fetchone()
+    profiling.record_query(sql, params, started, rows=[row] if row is not None else [])
+    return row
+
+
+def fetch_all(sql, params=()):
+    started = time.perf_counter()
+    with connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    profiling.record_query(sql, params, started, rows=rows)
+    return rows
+
+
+def execute(sql, params=()):
+    started = time.perf_counter()
+    with transaction() as conn:
+        cur = conn.execute(sql, params)
+    profiling.record_query(sql, params, started, rowcount=cur.rowcount, nbytes=0)
+    return cur
+
+
+def executemany(sql, rows):
+    started = time.perf_counter()
+    with transaction() as conn:
+        cur = conn.executemany(sql, rows)
+    profiling.record_query(sql, (), started, rowcount=cur.rowcount, nbytes=0)
+    return cur
+
+
+def executescript(script):
+    with connection() as conn:
+        conn.executescript(script)
@@ -0,0 +1,107 @@
+# hms/export.py - Chunked table export to CSV and Parquet with bounded memory
+import datetime
+import io
+import tempfile
+
+import pandas as pd
+
+from hms import db
+from hms.schema import PRIMARY_KEYS, table_columns
+
+CHUNK_SIZE = 10000
+SPOOL_MAX_BYTES = 16 * 1024 * 1024   # larger exports spill to a temp file on disk
+
+# Which filters make sense for each table, and the column a date range applies to.
+EXPORT_FILTERS = {
+    "Patients": [],
+    "Doctors": [],
+    "Appointments": ["date_range", "doc_id", "status"],
+    "MedicalRecords": ["doc_id"],
+    "Billings": ["date_range", "payment_status"],
+}
+DATE_COLUMNS = {"Appointments": "app_date", "Billings": "billed_on"}
+
+
+def _where(table_name, filters):
+    clauses, params = [], []
+    allowed = EXPORT_FILTERS[table_name]
+    date_from, date_to = filters.get("date_from"), filters.get("date_to")
+    if "date_range" in allowed and date_from:
+        clauses.append(f"{DATE_COLUMNS[table_name]} >= ?")
+        params.append(str(date_from))
+    if "date_range" in allowed and date_to:
+        clauses.append(f"{DATE_COLUMNS[table_name]} <= ?")
+        params.append(str(date_to))
+    for column in ("doc_id", "status", "payment_status"):
+        if column in allowed and filters.get(column):
+            clauses.append(f"{column} = ?")
+            params.append(filters[column])
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def iter_chunks(table_name, filters=None, chunk_size=CHUNK_SIZE):
+    # Rows are pulled from one open cursor with fetchmany, so at most one
+    # chunk is materialized in pandas at a time.
+    where, params = _where(table_name, filters or {})
+    columns = table_columns(table_name)
+    sql = f"SELECT * FROM {table_name}{where} ORDER BY {PRIMARY_KEYS[table_name]}"
+    with db.connection() as conn:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield pd.DataFrame(rows, columns=columns)
+
+
+def write_csv(chunks, out, columns=None):
+    header = True
+    for chunk in chunks:
+        chunk.to_csv(out, header=header, index=False)
+        header = False
+    if header and columns is not None:
+        pd.DataFrame(columns=columns).to_csv(out, index=False)
+
+
+def _arrow_schema(pa, table_name):
+    # Derived from the declared SQLite types rather than inferred per chunk, so
+    # a column that happens to be all NULL in the first chunk still gets the
+    # right type for every row group.
+    types = {"INTEGER": pa.int64(), "REAL": pa.float64()}
+    rows = db.fetch_all(f"PRAGMA table_info({table_name})")
+    return pa.schema([(row[1], types.get(row[2].upper(), pa.string())) for row in rows])
+
+
+def write_parquet(chunks, out, table_name):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ValueError("Parquet export needs the optional 'pyarrow' package.") from e
+    schema = _arrow_schema(pa, table_name)
+    # Each chunk becomes one row group.
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def export_table(table_name, fmt="csv", filters=None, chunk_size=CHUNK_SIZE):
+    # Returns the export as bytes, which st.download_button accepts (it reads
+    # any file object into bytes anyway). Only one chunk is a DataFrame at a
+    # time; the encoded output builds up in a spooled temp file.
+    chunks = iter_chunks(table_name, filters, chunk_size)
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as out:
+        if fmt == "parquet":
+            write_parquet(chunks, out, table_name)
+        else:
+            text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+            write_csv(chunks, text, table_columns(table_name))
+            text.flush()
+            text.detach()
+        out.seek(0)
+        return out.read()
+
+
+def export_filename(table_name, fmt):
+    return f"{table_name.lower()}_{datetime.date.today():%Y%m%d}.{fmt}"
+
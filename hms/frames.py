@@ -0,0 +1,84 @@
+# hms/frames.py - Compact dtypes for the DataFrames the read helpers return
+import os
+
+import pandas as pd
+
+# Per-table dtype schema. Ids and ages are downcast to nullable integers
+# (LEFT JOINs and old rows can leave them NULL), the fixed enums become
+# categorical, and everything else keeps what pandas infers. Free text such
+# as specialty stays a string even when it repeats: st.data_editor shows a
+# categorical as a selectbox of its categories, which would stop the grids
+# from taking new values. Money is float64: float32 cannot hold cents
+# exactly beyond ~100k.
+GENDERS = ("Male", "Female", "Other")
+APPOINTMENT_STATUSES = ("Scheduled", "Completed", "Cancelled")
+PAYMENT_STATUSES = ("Pending", "Paid", "Overdue")
+
+DTYPES = {
+    "Patients": {"pat_id": "Int32", "age": "Int16", "gender": pd.CategoricalDtype(GENDERS)},
+    "Doctors": {"doc_id": "Int32", "dept_id": "Int32"},
+    "Appointments": {"app_id": "Int32", "pat_id": "Int32", "doc_id": "Int32",
+                     "status": pd.CategoricalDtype(APPOINTMENT_STATUSES)},
+    "MedicalRecords": {"record_id": "Int32", "pat_id": "Int32", "doc_id": "Int32"},
+    "Billings": {"bill_id": "Int32", "pat_id": "Int32", "amount": "float64",
+                 "payment_status": pd.CategoricalDtype(PAYMENT_STATUSES)},
+}
+
+# Column names mean the same thing in every table, view and report query, so
+# results are typed by column name; that also covers joins and aggregates.
+COLUMN_DTYPES = {column: dtype for columns in DTYPES.values() for column, dtype in columns.items()}
+
+# pandas 3 already stores text as Arrow-backed `str`; on older pandas, text
+# columns left as object are converted when pyarrow is available.
+ARROW_STRINGS = os.environ.get("HMS_ARROW_STRINGS", "1") != "0"
+
+
+def _categorical(values, dtype):
+    # Unknown values (legacy spellings, a status from another table in a
+    # UNION) extend the categories instead of turning into NaN.
+    extra = sorted(set(values.dropna().unique()) - set(dtype.categories))
+    if extra:
+        dtype = pd.CategoricalDtype(list(dtype.categories) + extra)
+    return values.astype(dtype)
+
+
+def _arrow_strings(values):
+    # All-NULL columns stay object: they may be numbers in the next result.
+    if pd.api.types.infer_dtype(values, skipna=True) != "string":
+        return values
+    try:
+        return values.astype(pd.StringDtype("pyarrow"))
+    except ImportError:
+        return values
+
+
+def compact(df):
+    # Converts in place of a fresh result frame and returns it. A column that
+    # does not fit its dtype (SQLite is dynamically typed) is left as read.
+    for column in df.columns:
+        dtype = COLUMN_DTYPES.get(column)
+        values = df[column]
+        try:
+            if isinstance(dtype, pd.CategoricalDtype):
+                if not isinstance(values.dtype, pd.CategoricalDtype):
+                    df[column] = _categorical(values, dtype)
+            elif dtype is not None:
+                if values.dtype != dtype:
+                    df[column] = values.astype(dtype)
+            elif ARROW_STRINGS and values.dtype == object:
+                df[column] = _arrow_strings(values)
+        except (TypeError, ValueError):
+            pass
+    return df
+
+
+def plain(data):
+    # A frame or row with NULLs as None instead of pd.NA, for code that tests
+    # values for truth (`value or default`); pd.NA refuses to be a bool.
+    data = data.astype(object)
+    return data.where(data.notna(), None)
+
+
+def frame(rows, columns):
+    # For helpers that fetch rows themselves instead of going through db.read_df.
+    return compact(pd.DataFrame.from_records(rows, columns=columns, coerce_float=True))
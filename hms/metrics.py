@@ -0,0 +1,37 @@
+# hms/metrics.py - Dashboard counters computed with aggregate SQL
+import datetime
+
+from hms import db
+from hms.cache import ttl_cache
+
+METRICS_TTL = 30  # seconds
+
+
+@ttl_cache(METRICS_TTL)
+def _dashboard_counts(today):
+    patients, doctors, appointments_today = db.fetch_one("""
+        SELECT (SELECT COUNT(*) FROM Patients),
+               (SELECT COUNT(*) FROM Doctors),
+               (SELECT COUNT(*) FROM Appointments WHERE app_date = ?)
+    """, (today,))
+    by_status = dict(db.fetch_all("""
+        SELECT status, COUNT(*) FROM Appointments
+        WHERE app_date = ?
+        GROUP BY status
+    """, (today,)))
+    return {
+        "patients": patients,
+        "doctors": doctors,
+        "appointments_today": appointments_today,
+        "appointments_today_by_status": by_status,
+    }
+
+
+def dashboard_counts(today=None):
+    # app_date is stored as str(datetime.date), i.e. ISO "YYYY-MM-DD".
+    today = today or datetime.date.today()
+    return _dashboard_counts(str(today))
+
+
+def clear():
+    _dashboard_counts.cache_clear()
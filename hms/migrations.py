@@ -0,0 +1,437 @@
+# hms/migrations.py - Versioned schema migrations tracked with PRAGMA user_version
+import threading
+
+import pandas as pd
+
+from hms import db
+from hms.schema import FTS_COLUMNS, PRIMARY_KEYS
+
+# Each step is applied in its own transaction together with the bump of
+# user_version, so a crash mid-migration leaves the previous version intact.
+# Append new steps; never edit or reorder ones that have shipped.
+
+
+def _create_tables(conn):
+    for sql in (
+        """CREATE TABLE IF NOT EXISTS Patients (
+            pat_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            age INTEGER,
+            gender TEXT,
+            phone TEXT,
+            address TEXT,
+            email TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS Doctors (
+            doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            specialty TEXT,
+            dept_id INTEGER,
+            phone TEXT,
+            email TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS Appointments (
+            app_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pat_id INTEGER,
+            doc_id INTEGER,
+            app_date TEXT,
+            app_time TEXT,
+            status TEXT DEFAULT 'Scheduled'
+        )""",
+        """CREATE TABLE IF NOT EXISTS MedicalRecords (
+            record_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pat_id INTEGER,
+            doc_id INTEGER,
+            diagnosis TEXT,
+            treatment TEXT,
+            prescription TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS Billings (
+            bill_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pat_id INTEGER,
+            amount REAL,
+            details TEXT,
+            payment_status TEXT DEFAULT 'Pending'
+        )""",
+    ):
+        conn.execute(sql)
+
+
+def _reconcile_doctors(conn):
+    # Databases first created by hospital_plots.py have Doctors(doc_id, name,
+    # specialty) only. Appending the missing columns in order keeps positional
+    # row access (row[3] = dept_id, ...) in the management pages valid.
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(Doctors)")}
+    for column, col_type in (("dept_id", "INTEGER"), ("phone", "TEXT"), ("email", "TEXT")):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE Doctors ADD COLUMN {column} {col_type}")
+
+
+def _add_indexes(conn):
+    for sql in (
+        "CREATE INDEX IF NOT EXISTS idx_appointments_doc_date ON Appointments(doc_id, app_date)",
+        "CREATE INDEX IF NOT EXISTS idx_appointments_pat ON Appointments(pat_id)",
+        "CREATE INDEX IF NOT EXISTS idx_appointments_date ON Appointments(app_date)",
+        "CREATE INDEX IF NOT EXISTS idx_medicalrecords_pat ON MedicalRecords(pat_id)",
+        "CREATE INDEX IF NOT EXISTS idx_billings_pat_status ON Billings(pat_id, payment_status)",
+        "CREATE INDEX IF NOT EXISTS idx_patients_phone ON Patients(phone)",
+    ):
+        conn.execute(sql)
+
+
+def _create_fts(conn):
+    # External-content FTS5 tables store only the index, not a second copy of
+    # the text; triggers keep them in step with the base table.
+    for table, columns in FTS_COLUMNS.items():
+        pk = PRIMARY_KEYS[table]
+        cols = ", ".join(columns)
+        new_vals = ", ".join(f"new.{c}" for c in columns)
+        old_vals = ", ".join(f"old.{c}" for c in columns)
+        fts = f"{table}_fts"
+        conn.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {cols}, content='{table}', content_rowid='{pk}',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3')""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.{pk}, {new_vals});
+        END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{pk}, {old_vals});
+        END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{pk}, {old_vals});
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.{pk}, {new_vals});
+        END""")
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _add_slot_indexes(conn):
+    # app_time joins the doctor/date index so conflict checks are a single
+    # range probe; the old two-column index is a prefix of it.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_doc_date_time "
+                 "ON Appointments(doc_id, app_date, app_time)")
+    conn.execute("DROP INDEX IF EXISTS idx_appointments_doc_date")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_doctors_specialty ON Doctors(specialty)")
+
+
+def _create_detail_views(conn):
+    # LEFT JOINs on the primary keys: each name is a rowid lookup, and rows
+    # whose patient or doctor was deleted still show up (with a NULL name).
+    conn.execute("""CREATE VIEW IF NOT EXISTS AppointmentDetails AS
+        SELECT a.app_id, a.pat_id, p.name AS patient_name, a.doc_id, d.name AS doctor_name,
+               d.specialty, a.app_date, a.app_time, a.status
+        FROM Appointments a
+        LEFT JOIN Patients p ON p.pat_id = a.pat_id
+        LEFT JOIN Doctors d ON d.doc_id = a.doc_id""")
+    conn.execute("""CREATE VIEW IF NOT EXISTS MedicalRecordDetails AS
+        SELECT r.record_id, r.pat_id, p.name AS patient_name, r.doc_id, d.name AS doctor_name,
+               r.diagnosis, r.treatment, r.prescription
+        FROM MedicalRecords r
+        LEFT JOIN Patients p ON p.pat_id = r.pat_id
+        LEFT JOIN Doctors d ON d.doc_id = r.doc_id""")
+    conn.execute("""CREATE VIEW IF NOT EXISTS BillingDetails AS
+        SELECT b.bill_id, b.pat_id, p.name AS patient_name, b.amount, b.details, b.payment_status
+        FROM Billings b
+        LEFT JOIN Patients p ON p.pat_id = b.pat_id""")
+
+
+def _add_billing_aggregates(conn):
+    # Billings had no date, so there was nothing to age or window by. New
+    # bills are stamped by trigger (ALTER TABLE cannot add a CURRENT_DATE
+    # default); existing bills keep billed_on NULL.
+    conn.execute("ALTER TABLE Billings ADD COLUMN billed_on TEXT")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS billings_stamp_date AFTER INSERT ON Billings
+        WHEN new.billed_on IS NULL BEGIN
+            UPDATE Billings SET billed_on = date('now') WHERE bill_id = new.bill_id;
+        END""")
+    # Stamping the date is an UPDATE; keep it from re-indexing the bill's text.
+    conn.execute("DROP TRIGGER IF EXISTS Billings_fts_au")
+    conn.execute("""CREATE TRIGGER Billings_fts_au AFTER UPDATE OF details, payment_status ON Billings BEGIN
+            INSERT INTO Billings_fts(Billings_fts, rowid, details, payment_status)
+            VALUES ('delete', old.bill_id, old.details, old.payment_status);
+            INSERT INTO Billings_fts(rowid, details, payment_status) VALUES (new.bill_id, new.details, new.payment_status);
+        END""")
+    conn.execute("DROP VIEW IF EXISTS BillingDetails")
+    conn.execute("""CREATE VIEW BillingDetails AS
+        SELECT b.bill_id, b.pat_id, p.name AS patient_name, b.amount, b.details, b.payment_status, b.billed_on
+        FROM Billings b
+        LEFT JOIN Patients p ON p.pat_id = b.pat_id""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_billings_billed_on ON Billings(billed_on)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_billings_status_billed_on "
+                 "ON Billings(payment_status, billed_on, amount)")
+
+    # Running totals per (patient, status) and per status. NULL pat_id and
+    # payment_status are folded to 0 / '' so they can be part of the key.
+    conn.execute("""CREATE TABLE IF NOT EXISTS BillingSummary (
+            pat_id INTEGER NOT NULL,
+            payment_status TEXT NOT NULL,
+            bill_count INTEGER NOT NULL,
+            total_amount REAL NOT NULL,
+            PRIMARY KEY (pat_id, payment_status)
+        ) WITHOUT ROWID""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS BillingStatusTotals (
+            payment_status TEXT PRIMARY KEY,
+            bill_count INTEGER NOT NULL,
+            total_amount REAL NOT NULL
+        ) WITHOUT ROWID""")
+
+    def add(row):
+        return f"""
+            INSERT INTO BillingSummary (pat_id, payment_status, bill_count, total_amount)
+            VALUES (COALESCE({row}.pat_id, 0), COALESCE({row}.payment_status, ''), 1, COALESCE({row}.amount, 0))
+            ON CONFLICT (pat_id, payment_status) DO UPDATE SET
+                bill_count = bill_count + 1, total_amount = total_amount + excluded.total_amount;
+            INSERT INTO BillingStatusTotals (payment_status, bill_count, total_amount)
+            VALUES (COALESCE({row}.payment_status, ''), 1, COALESCE({row}.amount, 0))
+            ON CONFLICT (payment_status) DO UPDATE SET
+                bill_count = bill_count + 1, total_amount = total_amount + excluded.total_amount;"""
+
+    def remove(row):
+        return f"""
+            UPDATE BillingSummary SET bill_count = bill_count - 1, total_amount = total_amount - COALESCE({row}.amount, 0)
+            WHERE pat_id = COALESCE({row}.pat_id, 0) AND payment_status = COALESCE({row}.payment_status, '');
+            DELETE FROM BillingSummary
+            WHERE pat_id = COALESCE({row}.pat_id, 0) AND payment_status = COALESCE({row}.payment_status, '')
+              AND bill_count = 0;
+            UPDATE BillingStatusTotals SET bill_count = bill_count - 1, total_amount = total_amount - COALESCE({row}.amount, 0)
+            WHERE payment_status = COALESCE({row}.payment_status, '');"""
+
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS billings_summary_ai AFTER INSERT ON Billings BEGIN {add('new')} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS billings_summary_ad AFTER DELETE ON Billings BEGIN {remove('old')} END")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS billings_summary_au
+        AFTER UPDATE OF pat_id, amount, payment_status ON Billings
+        BEGIN {remove('old')} {add('new')} END""")
+
+    conn.execute("""INSERT INTO BillingSummary (pat_id, payment_status, bill_count, total_amount)
+        SELECT COALESCE(pat_id, 0), COALESCE(payment_status, ''), COUNT(*), COALESCE(SUM(amount), 0)
+        FROM Billings GROUP BY 1, 2""")
+    conn.execute("""INSERT INTO BillingStatusTotals (payment_status, bill_count, total_amount)
+        SELECT COALESCE(payment_status, ''), COUNT(*), COALESCE(SUM(amount), 0)
+        FROM Billings GROUP BY 1""")
+
+
+def _add_analytics_indexes(conn):
+    # Covering indexes for the dashboard GROUP BYs. The app_date index grows
+    # status and doc_id so date-windowed counts never touch the table.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_date_status_doc "
+                 "ON Appointments(app_date, status, doc_id)")
+    conn.execute("DROP INDEX IF EXISTS idx_appointments_date")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_patients_gender_age ON Patients(gender, age)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_medicalrecords_diagnosis ON MedicalRecords(diagnosis)")
+
+
+def _add_snapshot_changes(conn):
+    # Updated and deleted primary keys, for the incremental Parquet snapshot
+    # (hms.snapshot). Inserts need no log: they land above the watermark.
+    conn.execute("""CREATE TABLE IF NOT EXISTS SnapshotChanges (
+            seq INTEGER PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            pk INTEGER NOT NULL
+        )""")
+    for table, pk in PRIMARY_KEYS.items():
+        for event in ("UPDATE", "DELETE"):
+            conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table.lower()}_snapshot_{event[0].lower()}
+                AFTER {event} ON {table} BEGIN
+                    INSERT INTO SnapshotChanges (table_name, pk) VALUES ('{table}', old.{pk});
+                END""")
+
+
+def _normalize_appointment_times(conn):
+    # app_date/app_time become canonical ISO-8601 ("YYYY-MM-DD", "HH:MM:SS",
+    # clinic wall-clock time), so text order is time order and every date
+    # filter is an index range instead of a LIKE scan.
+    conn.execute("""UPDATE Appointments SET app_date = date(app_date)
+        WHERE date(app_date) IS NOT NULL AND app_date IS NOT date(app_date)""")
+    conn.execute("""UPDATE Appointments SET app_time = time(app_time)
+        WHERE time(app_time) IS NOT NULL AND app_time IS NOT time(app_time)""")
+    # Whatever SQLite cannot read (e.g. "10/17/2025", "2:30 PM") is parsed
+    # here; values nothing can parse are left for a human to fix.
+    legacy = conn.execute("""SELECT app_id, app_date, app_time FROM Appointments
+        WHERE (app_date IS NOT NULL AND date(app_date) IS NULL)
+           OR (app_time IS NOT NULL AND time(app_time) IS NULL)""").fetchall()
+    for app_id, app_date, app_time in legacy:
+        date = pd.to_datetime(app_date, errors="coerce")
+        time = pd.to_datetime(app_time, format="mixed", errors="coerce")
+        conn.execute("UPDATE Appointments SET app_date = ?, app_time = ? WHERE app_id = ?",
+                     (app_date if pd.isna(date) else date.strftime("%Y-%m-%d"),
+                      app_time if pd.isna(time) else time.strftime("%H:%M:%S"),
+                      app_id))
+
+    # New values must be readable as a date/time; readable but non-canonical
+    # ones (e.g. "09:30", "2025-10-17 00:00:00") are rewritten in place.
+    for event in ("INSERT", "UPDATE OF app_date, app_time"):
+        name = event.split()[0].lower()
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS appointments_check_ts_{name}
+            BEFORE {event} ON Appointments BEGIN
+                SELECT RAISE(ABORT, 'app_date must be a YYYY-MM-DD date')
+                WHERE new.app_date IS NOT NULL AND date(new.app_date) IS NULL;
+                SELECT RAISE(ABORT, 'app_time must be a HH:MM[:SS] time')
+                WHERE new.app_time IS NOT NULL AND time(new.app_time) IS NULL;
+            END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS appointments_normalize_ts_{name}
+            AFTER {event} ON Appointments
+            WHEN new.app_date IS NOT date(new.app_date) OR new.app_time IS NOT time(new.app_time) BEGIN
+                UPDATE Appointments SET app_date = date(new.app_date), app_time = time(new.app_time)
+                WHERE app_id = new.app_id;
+            END""")
+    # Status filters seek on status, then range-scan the dates in time order.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_status_date_time "
+                 "ON Appointments(status, app_date, app_time)")
+
+
+def _add_patient_timeline_indexes(conn):
+    # MedicalRecords had no date to place them on a timeline; stamped like
+    # Billings.billed_on, existing records stay undated.
+    conn.execute("ALTER TABLE MedicalRecords ADD COLUMN recorded_on TEXT")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS medicalrecords_stamp_date AFTER INSERT ON MedicalRecords
+        WHEN new.recorded_on IS NULL BEGIN
+            UPDATE MedicalRecords SET recorded_on = date('now') WHERE record_id = new.record_id;
+        END""")
+    conn.execute("DROP VIEW IF EXISTS MedicalRecordDetails")
+    conn.execute("""CREATE VIEW MedicalRecordDetails AS
+        SELECT r.record_id, r.pat_id, p.name AS patient_name, r.doc_id, d.name AS doctor_name,
+               r.diagnosis, r.treatment, r.prescription, r.recorded_on
+        FROM MedicalRecords r
+        LEFT JOIN Patients p ON p.pat_id = r.pat_id
+        LEFT JOIN Doctors d ON d.doc_id = r.doc_id""")
+    # Covering indexes for hms.timeline, in timeline order: a page of one
+    # patient's entries is a backwards index scan that stops after the page,
+    # with no sort and no row lookups. Each replaces a pat_id index it extends.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_pat_timeline "
+                 "ON Appointments(pat_id, app_date, app_time, app_id, doc_id, status)")
+    conn.execute("DROP INDEX IF EXISTS idx_appointments_pat")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_medicalrecords_pat_timeline "
+                 "ON MedicalRecords(pat_id, recorded_on, record_id, doc_id, diagnosis)")
+    conn.execute("DROP INDEX IF EXISTS idx_medicalrecords_pat")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_billings_pat_timeline "
+                 "ON Billings(pat_id, billed_on, bill_id, payment_status, amount)")
+
+
+def _add_table_versions(conn):
+    # One counter per table, bumped by every committed write whichever
+    # process made it. hms.cache polls it to invalidate across replicas.
+    conn.execute("""CREATE TABLE IF NOT EXISTS TableVersions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID""")
+    for table in PRIMARY_KEYS:
+        conn.execute("INSERT OR IGNORE INTO TableVersions VALUES (?, 0)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table.lower()}_version_{event[0].lower()}
+                AFTER {event} ON {table} BEGIN
+                    UPDATE TableVersions SET version = version + 1 WHERE table_name = '{table}';
+                END""")
+
+
+# Columns filled in by an AFTER INSERT trigger (steps 7 and 11).
+STAMP_COLUMNS = {"Billings": "billed_on", "MedicalRecords": "recorded_on"}
+
+
+def _snapshot_update_trigger(conn, table):
+    # Logs an UPDATE only if it changed something other than the insert-time
+    # stamp, so an insert (stamped by a follow-up UPDATE) leaves no entry and
+    # a save of unchanged values neither. It lists the columns, so a step
+    # that adds a column to a snapshotted table must call this again.
+    pk = PRIMARY_KEYS[table]
+    stamp = STAMP_COLUMNS.get(table)
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    changed = [f"new.{c} IS NOT old.{c}" for c in columns if c != stamp]
+    if stamp:
+        changed.append(f"(old.{stamp} IS NOT NULL AND new.{stamp} IS NOT old.{stamp})")
+    conn.execute(f"DROP TRIGGER IF EXISTS {table.lower()}_snapshot_u")
+    conn.execute(f"""CREATE TRIGGER {table.lower()}_snapshot_u
+        AFTER UPDATE ON {table} WHEN {' OR '.join(changed)} BEGIN
+            INSERT INTO SnapshotChanges (table_name, pk) VALUES ('{table}', old.{pk});
+        END""")
+
+
+def _bound_snapshot_changes(conn):
+    # The log is pruned on write: a new entry replaces older ones for the same
+    # row, so between refreshes it holds at most one entry per changed row
+    # instead of one per write. A refresh still sees every changed row.
+    conn.execute("""DELETE FROM SnapshotChanges WHERE seq NOT IN (
+        SELECT MAX(seq) FROM SnapshotChanges GROUP BY table_name, pk)""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshotchanges_row ON SnapshotChanges(table_name, pk)")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS snapshotchanges_dedupe AFTER INSERT ON SnapshotChanges BEGIN
+            DELETE FROM SnapshotChanges
+            WHERE table_name = new.table_name AND pk = new.pk AND seq < new.seq;
+        END""")
+    for table in PRIMARY_KEYS:
+        _snapshot_update_trigger(conn, table)
+
+
+def _index_timeline_keys(conn):
+    # Rebuilds the step-11 indexes on the timeline's sort key itself (the
+    # `ts` expressions in hms.timeline, which must match character for
+    # character), so a "Load older" page seeks to its cursor instead of
+    # scanning the patient's newer entries. The raw columns stay in each
+    # index so it still covers the query.
+    conn.execute("DROP INDEX IF EXISTS idx_appointments_pat_timeline")
+    conn.execute("CREATE INDEX idx_appointments_pat_timeline ON Appointments(pat_id, "
+                 "COALESCE(app_date || COALESCE('T' || app_time, ''), ''), app_id, app_date, app_time, doc_id, status)")
+    conn.execute("DROP INDEX IF EXISTS idx_medicalrecords_pat_timeline")
+    conn.execute("CREATE INDEX idx_medicalrecords_pat_timeline ON MedicalRecords(pat_id, "
+                 "COALESCE(recorded_on, ''), record_id, recorded_on, doc_id, diagnosis)")
+    conn.execute("DROP INDEX IF EXISTS idx_billings_pat_timeline")
+    conn.execute("CREATE INDEX idx_billings_pat_timeline ON Billings(pat_id, "
+                 "COALESCE(billed_on, ''), bill_id, billed_on, payment_status, amount)")
+
+
+def _scope_record_fts_update(conn):
+    # As step 7 did for Billings: stamping recorded_on (step 11) is an UPDATE,
+    # and the unrestricted update trigger then sent the FTS index a 'delete'
+    # for a record it had not indexed yet, failing every insert. Rebuilt in
+    # case an earlier stray 'delete' got through.
+    conn.execute("DROP TRIGGER IF EXISTS MedicalRecords_fts_au")
+    conn.execute("""CREATE TRIGGER MedicalRecords_fts_au
+        AFTER UPDATE OF diagnosis, treatment, prescription ON MedicalRecords BEGIN
+            INSERT INTO MedicalRecords_fts(MedicalRecords_fts, rowid, diagnosis, treatment, prescription)
+            VALUES ('delete', old.record_id, old.diagnosis, old.treatment, old.prescription);
+            INSERT INTO MedicalRecords_fts(rowid, diagnosis, treatment, prescription)
+            VALUES (new.record_id, new.diagnosis, new.treatment, new.prescription);
+        END""")
+    conn.execute("INSERT INTO MedicalRecords_fts(MedicalRecords_fts) VALUES ('rebuild')")
+
+
+MIGRATIONS = [
+    _create_tables,        # 1
+    _reconcile_doctors,    # 2
+    _add_indexes,          # 3
+    _create_fts,           # 4
+    _add_slot_indexes,     # 5
+    _create_detail_views,  # 6
+    _add_billing_aggregates,  # 7
+    _add_analytics_indexes,   # 8
+    _add_snapshot_changes,    # 9
+    _normalize_appointment_times,  # 10
+    _add_patient_timeline_indexes,  # 11
+    _add_table_versions,      # 12
+    _bound_snapshot_changes,  # 13
+    _index_timeline_keys,     # 14
+    _scope_record_fts_update,  # 15
+]
+
+_applied = set()
+_lock = threading.Lock()
+
+
+def schema_version():
+    return db.fetch_one("PRAGMA user_version")[0]
+
+
+def migrate():
+    # Runs at most once per process and database file; Streamlit reruns the
+    # page script on every interaction, so callers can invoke this freely.
+    if db.DB_FILE in _applied:
+        return
+    with _lock:
+        if db.DB_FILE in _applied:
+            return
+        for version, step in enumerate(MIGRATIONS, start=1):
+            # Re-read inside the write lock: another process may have migrated.
+            with db.transaction() as conn:
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    continue
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+        db.fetch_one("PRAGMA optimize")
+        _applied.add(db.DB_FILE)
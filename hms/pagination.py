@@ -0,0 +1,74 @@
+# hms/pagination.py - Keyset pagination over the primary keys
+from collections import namedtuple
+
+from hms import archive, cache, db, frames
+from hms.schema import base_table, primary_key, table_columns
+
+# `next_cursor` is the (sort value, primary key) of the last row shown, or
+# None when this is the final page.
+Page = namedtuple("Page", ["rows", "next_cursor"])
+
+
+def _keyset_predicate(sort_column, pk, cursor, descending):
+    # SQLite sorts NULLs first ascending and last descending; the predicate
+    # mirrors that so rows with a NULL sort value are neither skipped nor
+    # repeated when paging through them.
+    value, last_pk = cursor
+    if sort_column == pk:
+        return (f"{pk} < ?" if descending else f"{pk} > ?"), (last_pk,)
+    if descending:
+        if value is None:
+            return f"({sort_column} IS NULL AND {pk} < ?)", (last_pk,)
+        return (f"({sort_column} < ? OR ({sort_column} = ? AND {pk} < ?) OR {sort_column} IS NULL)",
+                (value, value, last_pk))
+    if value is None:
+        return f"(({sort_column} IS NULL AND {pk} > ?) OR {sort_column} IS NOT NULL)", (last_pk,)
+    return f"({sort_column} > ? OR ({sort_column} = ? AND {pk} > ?))", (value, value, last_pk)
+
+
+@cache.cached_read
+def fetch_page(table_name, sort_column=None, page_size=50, cursor=None, descending=False,
+               include_archive=False):
+    # `table_name` may also be one of the schema.VIEW_TABLES views. Archived
+    # rows are left out unless include_archive is set.
+    pk = primary_key(table_name)
+    columns = table_columns(table_name)
+    sort_column = sort_column or pk
+    if sort_column not in columns:
+        raise ValueError(f"Cannot sort {table_name} by {sort_column}")
+
+    where, params = "", ()
+    if cursor is not None:
+        predicate, params = _keyset_predicate(sort_column, pk, cursor, descending)
+        where = f"WHERE {predicate}"
+    direction = "DESC" if descending else "ASC"
+    order = f"{pk} {direction}" if sort_column == pk else f"{sort_column} {direction}, {pk} {direction}"
+
+    # One extra row tells us whether another page follows without a COUNT.
+    with archive.connection() if include_archive else db.connection():
+        rows = db.fetch_all(
+            f"SELECT * FROM {archive.source(table_name, include_archive)} {where} ORDER BY {order} LIMIT ?",
+            params + (page_size + 1,))
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = (last[columns.index(sort_column)], last[columns.index(pk)])
+    return Page(frames.frame(rows, columns), next_cursor)
+
+
+@cache.cached_read
+def estimate_count(table_name, include_archive=False):
+    # MIN/MAX on the INTEGER PRIMARY KEY are O(log n) b-tree probes. Deleted
+    # ids make this an upper bound, which is fine for "page x of ~y" display.
+    table_name = base_table(table_name)
+    pk = primary_key(table_name)
+    tiers = ["main", archive.SCHEMA] if include_archive and table_name in archive.RULES else ["main"]
+    total = 0
+    with archive.connection() if include_archive else db.connection():
+        for tier in tiers:
+            low, high = db.fetch_one(f"SELECT MIN({pk}), MAX({pk}) FROM {tier}.{table_name}")
+            total += 0 if high is None else high - low + 1
+    return total
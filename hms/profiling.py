@@ -0,0 +1,148 @@
+# hms/profiling.py - Query and page-rerun timings kept in an in-process ring buffer
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+ENABLED = os.environ.get("HMS_PROFILING", "1") != "0"
+BUFFER_SIZE = int(os.environ.get("HMS_PROFILE_BUFFER", "5000"))
+SLOW_QUERY_MS = float(os.environ.get("HMS_SLOW_QUERY_MS", "100"))
+LOG_FILE = os.environ.get("HMS_PROFILE_LOG")    # optional JSON-lines sink
+
+_events = deque(maxlen=BUFFER_SIZE)
+_slow = deque(maxlen=200)
+_lock_waits = deque(maxlen=BUFFER_SIZE)
+_log_lock = threading.Lock()
+_local = threading.local()
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _estimate_bytes(rows):
+    # Sample the first rows instead of walking the whole result.
+    if not rows:
+        return 0
+    sample = rows[:50]
+    per_row = sum(sys.getsizeof(v) for row in sample for v in row) / len(sample)
+    return int(per_row * len(rows))
+
+
+def _emit(event):
+    _events.append(event)
+    if LOG_FILE:
+        with _log_lock, open(LOG_FILE, "a") as f:
+            f.write(json.dumps(event, default=str) + "\n")
+
+
+def record_query(sql, params, started, rows=None, rowcount=None, convert_s=0.0, nbytes=None):
+    # `started` is a perf_counter() taken before execute; `convert_s` is the
+    # part spent turning rows into a DataFrame, reported separately so pandas
+    # cost is not blamed on SQLite.
+    if not ENABLED:
+        return
+    elapsed = time.perf_counter() - started
+    sql_ms = (elapsed - convert_s) * 1000
+    event = {
+        "kind": "query",
+        "name": _WHITESPACE.sub(" ", sql).strip(),
+        "ts": time.time(),
+        "duration_ms": elapsed * 1000,
+        "sql_ms": sql_ms,
+        "convert_ms": convert_s * 1000,
+        "rows": len(rows) if rows is not None else rowcount,
+        "bytes": nbytes if nbytes is not None else _estimate_bytes(rows),
+    }
+    _emit(event)
+    _local.sql_ms = getattr(_local, "sql_ms", 0.0) + sql_ms
+    _local.convert_ms = getattr(_local, "convert_ms", 0.0) + convert_s * 1000
+    if event["duration_ms"] >= SLOW_QUERY_MS:
+        # Parameters are kept for slow queries only, so EXPLAIN can be rerun.
+        _slow.append(dict(event, params=list(params) if params else []))
+
+
+def record_lock_wait(started):
+    # Time spent in BEGIN IMMEDIATE, i.e. waiting for another connection (in
+    # this process or another) to release the write lock. Kept in its own
+    # ring so query events cannot push it out.
+    if not ENABLED:
+        return
+    _lock_waits.append((time.perf_counter() - started) * 1000)
+
+
+def lock_waits():
+    return list(_lock_waits)
+
+
+class Timer:
+    # Times one page rerun (or any block) and attributes the SQL and pandas
+    # time spent on this thread in the meantime; the remainder is rendering.
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.started = time.perf_counter()
+        self._sql_base = getattr(_local, "sql_ms", 0.0)
+        self._convert_base = getattr(_local, "convert_ms", 0.0)
+
+    def stop(self):
+        if not ENABLED:
+            return
+        total_ms = (time.perf_counter() - self.started) * 1000
+        sql_ms = getattr(_local, "sql_ms", 0.0) - self._sql_base
+        convert_ms = getattr(_local, "convert_ms", 0.0) - self._convert_base
+        _emit({
+            "kind": self.kind,
+            "name": self.name,
+            "ts": time.time(),
+            "duration_ms": total_ms,
+            "sql_ms": sql_ms,
+            "convert_ms": convert_ms,
+            "render_ms": max(total_ms - sql_ms - convert_ms, 0.0),
+        })
+
+
+def events(kind=None):
+    snapshot = list(_events)
+    return [e for e in snapshot if kind is None or e["kind"] == kind]
+
+
+def slow_queries():
+    return list(_slow)
+
+
+def summary(kind="query"):
+    # Per-name latency percentiles and volumes, slowest p95 first.
+    frame = pd.DataFrame(events(kind))
+    if frame.empty:
+        return frame
+    grouped = frame.groupby("name")
+    result = pd.DataFrame({
+        "calls": grouped.size(),
+        "p50_ms": grouped["duration_ms"].quantile(0.50),
+        "p95_ms": grouped["duration_ms"].quantile(0.95),
+        "p99_ms": grouped["duration_ms"].quantile(0.99),
+        "max_ms": grouped["duration_ms"].max(),
+        "sql_ms": grouped["sql_ms"].mean(),
+        "convert_ms": grouped["convert_ms"].mean(),
+    })
+    if "rows" in frame:
+        result["avg_rows"] = grouped["rows"].mean()
+        result["avg_bytes"] = grouped["bytes"].mean()
+    if "render_ms" in frame:
+        result["render_ms"] = grouped["render_ms"].mean()
+    return result.sort_values("p95_ms", ascending=False).reset_index()
+
+
+def explain(sql, params=()):
+    from hms import db
+    with db.connection() as conn:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def clear():
+    _events.clear()
+    _slow.clear()
+    _lock_waits.clear()
@@ -0,0 +1,222 @@
+# hms/scheduling.py - Doctor slot booking with conflict detection and free-slot lookup
+import datetime
+
+from hms import cache, db, writer
+from hms.schema import DETAIL_VIEWS
+
+SLOT_MINUTES = 30
+WORKDAY_START = datetime.time(9, 0)
+WORKDAY_END = datetime.time(17, 0)
+SEARCH_DAYS = 14
+RANGE_LIMIT = 1000              # rows returned by appointments_between
+BOOKING_FIELDS = ("pat_id", "doc_id", "app_date", "app_time", "status")
+
+# Cancelled appointments free their slot; every other status occupies it.
+FREE_STATUSES = ("Cancelled",)
+
+
+class SlotConflict(ValueError):
+    def __init__(self, doc_id, app_date, app_time, existing_app_id):
+        super().__init__(f"Doctor {doc_id} already has appointment #{existing_app_id} "
+                         f"within {SLOT_MINUTES} minutes of {app_date} {app_time}.")
+        self.doc_id = doc_id
+        self.app_date = app_date
+        self.app_time = app_time
+        self.existing_app_id = existing_app_id
+
+
+def _as_date(value):
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(str(value))
+
+
+def _as_time(value):
+    return value if isinstance(value, datetime.time) else datetime.time.fromisoformat(str(value))
+
+
+def _slot_window(app_time):
+    # Fixed-length slots overlap exactly when their start times are less than
+    # one slot apart, so a conflict is any booking strictly inside
+    # (start - slot, start + slot) on the same day. A bound that falls on
+    # another day is clamped to just outside this one ('' sorts below
+    # 00:00:00, 23:59:59.999999 above 23:59:59), so the exclusive comparisons
+    # still take bookings at midnight and in the last second.
+    day = datetime.date(2000, 1, 1)
+    start = datetime.datetime.combine(day, app_time)
+    slot = datetime.timedelta(minutes=SLOT_MINUTES)
+    low, high = start - slot, start + slot
+    return (str(low.time()) if low.date() == day else "",
+            str(high.time()) if high.date() == day else str(datetime.time.max))
+
+
+def find_conflict(conn, doc_id, app_date, app_time, exclude_app_id=None):
+    # Single probe of idx_appointments_doc_date_time (doc_id, app_date, app_time).
+    low, high = _slot_window(app_time)
+    row = conn.execute(f"""
+        SELECT app_id FROM Appointments
+        WHERE doc_id = ? AND app_date = ? AND app_time > ? AND app_time < ?
+          AND status NOT IN ({', '.join('?' for _ in FREE_STATUSES)})
+          AND app_id IS NOT ?
+        LIMIT 1
+    """, (doc_id, str(app_date), low, high, *FREE_STATUSES, exclude_app_id)).fetchone()
+    return row[0] if row else None
+
+
+def overlapping_ids(conn, doc_id, app_date, app_time):
+    # Every non-cancelled booking of the doctor within one slot of the given
+    # start, including one that starts exactly there.
+    low, high = _slot_window(_as_time(app_time))
+    return [row[0] for row in conn.execute(f"""
+        SELECT app_id FROM Appointments
+        WHERE doc_id = ? AND app_date = ? AND app_time > ? AND app_time < ?
+          AND status NOT IN ({', '.join('?' for _ in FREE_STATUSES)})
+        ORDER BY app_id
+    """, (doc_id, str(app_date), low, high, *FREE_STATUSES))]
+
+
+def _book(conn, pat_id, doc_id, app_date, app_time, status, app_id):
+    # Check and write share the caller's BEGIN IMMEDIATE transaction, so two
+    # sessions cannot both pass the check for the same slot.
+    values = (pat_id, doc_id, app_date.isoformat(), app_time.isoformat(timespec="seconds"), status)
+    if status not in FREE_STATUSES:
+        existing = find_conflict(conn, doc_id, app_date, app_time, exclude_app_id=app_id)
+        if existing is not None:
+            raise SlotConflict(doc_id, app_date, app_time, existing)
+    if app_id is None:
+        return conn.execute("""
+            INSERT INTO Appointments (pat_id, doc_id, app_date, app_time, status)
+            VALUES (?, ?, ?, ?, ?)
+        """, values).lastrowid
+    conn.execute("""
+        UPDATE Appointments SET pat_id = ?, doc_id = ?, app_date = ?, app_time = ?, status = ?
+        WHERE app_id = ?
+    """, values + (app_id,))
+    return app_id
+
+
+def _book_many(conn, bookings):
+    # All or nothing: one SlotConflict rolls back the whole list. A booking
+    # with an app_id updates that appointment and keeps the fields it omits;
+    # later bookings are checked against earlier ones in the same list.
+    ids = []
+    for booking in bookings:
+        app_id = booking.get("app_id")
+        fields = {"status": "Scheduled"}
+        if app_id is not None:
+            row = conn.execute(f"SELECT {', '.join(BOOKING_FIELDS)} FROM Appointments WHERE app_id = ?",
+                               (app_id,)).fetchone()
+            if row is None:
+                raise LookupError(f"Appointment {app_id} not found")
+            fields = dict(zip(BOOKING_FIELDS, row))
+        fields.update((k, v) for k, v in booking.items() if k in BOOKING_FIELDS)
+        missing = [f for f in BOOKING_FIELDS if fields.get(f) is None]
+        if missing:
+            raise ValueError(f"Appointment field(s) required: {', '.join(missing)}")
+        ids.append(_book(conn, fields.get("pat_id"), fields.get("doc_id"), _as_date(fields.get("app_date")),
+                         _as_time(fields.get("app_time")), fields["status"], app_id))
+    return ids
+
+
+def book_appointment_async(pat_id, doc_id, app_date, app_time, status="Scheduled", app_id=None):
+    # Queued on the writer thread; the Future raises SlotConflict on a clash.
+    return writer.submit(_book, pat_id, doc_id, _as_date(app_date), _as_time(app_time), status, app_id,
+                         tables=("Appointments",))
+
+
+def book_many_async(bookings):
+    # `bookings` are dicts of BOOKING_FIELDS (plus app_id for an update);
+    # the Future resolves to their ids, in order.
+    return writer.submit(_book_many, list(bookings), tables=("Appointments",))
+
+
+def book_appointment(pat_id, doc_id, app_date, app_time, status="Scheduled", app_id=None):
+    # Inserts a new appointment, or updates `app_id` when given, and returns
+    # its id. Raises SlotConflict.
+    return book_appointment_async(pat_id, doc_id, app_date, app_time, status, app_id).result()
+
+
+def week_bounds(day=None):
+    # Monday..Sunday of the week containing `day`.
+    day = day or datetime.date.today()
+    monday = day - datetime.timedelta(days=day.weekday())
+    return monday, monday + datetime.timedelta(days=6)
+
+
+@cache.cached_query("Appointments", "Patients", "Doctors")
+def appointments_between(date_from, date_to, statuses=(), detailed=True, limit=RANGE_LIMIT):
+    # Inclusive date range in time order. Without a status filter this is a
+    # range scan of the app_date index; with one, a seek per status on
+    # idx_appointments_status_date_time.
+    source = DETAIL_VIEWS["Appointments"] if detailed else "Appointments"
+    clauses, params = ["app_date BETWEEN ? AND ?"], [str(date_from), str(date_to)]
+    if statuses:
+        clauses.append(f"status IN ({', '.join('?' for _ in statuses)})")
+        params += list(statuses)
+    return db.read_df(f"""
+        SELECT * FROM {source} WHERE {' AND '.join(clauses)}
+        ORDER BY app_date, app_time, app_id LIMIT ?
+    """, params + [limit])
+
+
+def _day_slots(day):
+    slot = datetime.timedelta(minutes=SLOT_MINUTES)
+    current = datetime.datetime.combine(day, WORKDAY_START)
+    end = datetime.datetime.combine(day, WORKDAY_END)
+    while current + slot <= end:
+        yield current.time()
+        current += slot
+
+
+def _booked_on(day, doc_id=None, specialty=None):
+    # {doc_id: [booked start times]} for one day, from one indexed query.
+    free = ", ".join("?" for _ in FREE_STATUSES)
+    if doc_id is not None:
+        doctors = [doc_id]
+        rows = db.fetch_all(f"""
+            SELECT doc_id, app_time FROM Appointments
+            WHERE doc_id = ? AND app_date = ? AND status NOT IN ({free})
+        """, (doc_id, str(day), *FREE_STATUSES))
+    else:
+        doctors = [r[0] for r in db.fetch_all(
+            "SELECT doc_id FROM Doctors WHERE specialty = ? ORDER BY doc_id", (specialty,))]
+        rows = db.fetch_all(f"""
+            SELECT a.doc_id, a.app_time FROM Doctors d
+            JOIN Appointments a ON a.doc_id = d.doc_id AND a.app_date = ?
+            WHERE d.specialty = ? AND a.status NOT IN ({free})
+        """, (str(day), specialty, *FREE_STATUSES))
+    booked = {d: [] for d in doctors}
+    for doc, app_time in rows:
+        try:
+            booked.setdefault(doc, []).append(_as_time(app_time))
+        except ValueError:
+            continue    # legacy free-form time; cannot block a slot
+    return booked
+
+
+def _overlaps(slot_time, booked_times):
+    slot = SLOT_MINUTES * 60
+    start = slot_time.hour * 3600 + slot_time.minute * 60 + slot_time.second
+    return any(abs(start - (t.hour * 3600 + t.minute * 60 + t.second)) < slot for t in booked_times)
+
+
+def next_available_slots(doc_id=None, specialty=None, start=None, count=5, days=SEARCH_DAYS):
+    # Earliest free (doc_id, date, time) slots for one doctor or any doctor of
+    # a specialty, scanning one day at a time and stopping as soon as `count`
+    # slots are found.
+    if (doc_id is None) == (specialty is None):
+        raise ValueError("Pass exactly one of doc_id or specialty")
+    start = start or datetime.datetime.now()
+    found = []
+    for offset in range(days):
+        day = start.date() + datetime.timedelta(days=offset)
+        booked = _booked_on(day, doc_id=doc_id, specialty=specialty)
+        if not booked:
+            return found    # no doctors with that specialty
+        for slot_time in _day_slots(day):
+            if datetime.datetime.combine(day, slot_time) < start:
+                continue
+            for doc, times in booked.items():
+                if not _overlaps(slot_time, times):
+                    found.append((doc, day, slot_time))
+                    if len(found) == count:
+                        return found
+    return found
@@ -0,0 +1,53 @@
+# hms/schema.py - Table metadata shared by the data-access modules
+from hms import db
+
+PRIMARY_KEYS = {
+    "Patients": "pat_id",
+    "Doctors": "doc_id",
+    "Appointments": "app_id",
+    "MedicalRecords": "record_id",
+    "Billings": "bill_id",
+}
+
+# Read-only views that resolve patient and doctor names with joins on the
+# primary keys (see migrations), keyed by the table they extend. VIEW_TABLES
+# lists the base table first, then every table the view reads from.
+DETAIL_VIEWS = {
+    "Appointments": "AppointmentDetails",
+    "MedicalRecords": "MedicalRecordDetails",
+    "Billings": "BillingDetails",
+}
+VIEW_TABLES = {
+    "AppointmentDetails": ("Appointments", "Patients", "Doctors"),
+    "MedicalRecordDetails": ("MedicalRecords", "Patients", "Doctors"),
+    "BillingDetails": ("Billings", "Patients"),
+}
+
+_columns = {}
+
+
+def base_table(name):
+    return VIEW_TABLES[name][0] if name in VIEW_TABLES else name
+
+
+def primary_key(name):
+    return PRIMARY_KEYS[base_table(name)]
+
+
+def table_columns(table_name):
+    # Column names never change at runtime, so PRAGMA table_info is read once.
+    if table_name not in PRIMARY_KEYS and table_name not in VIEW_TABLES:
+        raise ValueError(f"Unknown table: {table_name}")
+    if table_name not in _columns:
+        rows = db.fetch_all(f"PRAGMA table_info({table_name})")
+        _columns[table_name] = [row[1] for row in rows]
+    return _columns[table_name]
+
+
+# Columns mirrored into the <table>_fts full-text indexes (see migrations).
+FTS_COLUMNS = {
+    "Patients": ["name", "phone", "email"],
+    "Doctors": ["name", "specialty"],
+    "MedicalRecords": ["diagnosis", "treatment", "prescription"],
+    "Billings": ["details", "payment_status"],
+}
@@ -0,0 +1,42 @@
+# hms/search.py - Ranked prefix search over the FTS5 indexes
+import re
+
+from hms import db, frames
+from hms.schema import DETAIL_VIEWS, FTS_COLUMNS, PRIMARY_KEYS, table_columns
+
+SEARCH_LIMIT = 100
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def match_expression(query):
+    # Quote every token so user input can never be parsed as FTS5 syntax
+    # (AND/OR/NEAR, column filters, unbalanced quotes), and make each one a
+    # prefix term: "jo smi" finds "John Smith". Terms are implicitly ANDed.
+    tokens = _TOKEN.findall(query)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def has_index(table_name):
+    return table_name in FTS_COLUMNS
+
+
+def search(table_name, query, limit=SEARCH_LIMIT, detailed=False):
+    # detailed=True returns rows of the table's DETAIL_VIEWS view instead,
+    # i.e. with patient/doctor names joined in.
+    source = DETAIL_VIEWS.get(table_name, table_name) if detailed else table_name
+    expression = match_expression(query)
+    if not expression:
+        return frames.frame([], table_columns(source))
+    pk = PRIMARY_KEYS[table_name]
+    # Rank and cut inside the FTS subquery so only the top-N rowids are joined
+    # back to the base table.
+    return db.read_df(f"""
+        SELECT t.* FROM (
+            SELECT rowid, rank FROM {table_name}_fts
+            WHERE {table_name}_fts MATCH ?
+            ORDER BY rank LIMIT ?
+        ) AS hits
+        JOIN {source} AS t ON t.{pk} = hits.rowid
+        ORDER BY hits.rank
+    """, (expression, limit))
@@ -0,0 +1,208 @@
+# hms/snapshot.py - Incremental Parquet snapshot of the tables for reporting queries
+import argparse
+import datetime
+import glob
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from hms import archive, db, export
+from hms.schema import PRIMARY_KEYS, table_columns
+
+# Each table is split into parts by primary-key range, so a refresh rewrites
+# only the parts that gained rows (above the watermark) or had rows updated
+# or deleted (logged in SnapshotChanges by trigger).
+PART_ROWS = 50000
+CHUNK_SIZE = 10000
+MANIFEST = "manifest.json"
+
+
+def snapshot_dir(db_file=None):
+    # hospital.db -> hospital_snapshot/, unless HMS_SNAPSHOT_DIR says otherwise.
+    if os.environ.get("HMS_SNAPSHOT_DIR"):
+        return os.environ["HMS_SNAPSHOT_DIR"]
+    return f"{os.path.splitext(db_file or db.DB_FILE)[0]}_snapshot"
+
+
+def load_manifest(directory=None):
+    path = os.path.join(directory or snapshot_dir(), MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _part_path(directory, table_name, part):
+    return os.path.join(directory, table_name, f"part-{part:05d}.parquet")
+
+
+def _part_chunks(conn, table_name, part):
+    # Hot and archived rows alike: reports cover the hospital's whole history.
+    pk = PRIMARY_KEYS[table_name]
+    cur = conn.execute(
+        f"SELECT * FROM {archive.source(table_name, True)} WHERE {pk} >= ? AND {pk} < ? ORDER BY {pk}",
+        (part * PART_ROWS, (part + 1) * PART_ROWS))
+    columns = table_columns(table_name)
+    while True:
+        rows = cur.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        yield pd.DataFrame(rows, columns=columns)
+
+
+def _write_part(conn, directory, table_name, part):
+    # Written beside the old part and swapped in, so readers never see a
+    # half-written file. A part whose rows are all gone is removed.
+    path = _part_path(directory, table_name, part)
+    chunks = _part_chunks(conn, table_name, part)
+    first = next(chunks, None)
+    if first is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return 0
+    rows = len(first)
+
+    def counted():
+        nonlocal rows
+        yield first
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+
+    with open(path + ".tmp", "wb") as out:
+        export.write_parquet(counted(), out, table_name)
+    os.replace(path + ".tmp", path)
+    return rows
+
+
+def refresh(directory=None, full=False):
+    # Returns {table: parts rewritten}. The change log and the rows are read
+    # in one deferred transaction, i.e. one consistent WAL snapshot, which
+    # never blocks the front desk's writers.
+    directory = directory or snapshot_dir()
+    if full and os.path.isdir(directory):
+        shutil.rmtree(directory)
+    manifest = load_manifest(directory)
+    tables = manifest.setdefault("tables", {})
+    rewritten = {}
+    with archive.connection() as conn:
+        conn.execute("BEGIN")
+        try:
+            last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM SnapshotChanges").fetchone()[0]
+            for table_name, pk in PRIMARY_KEYS.items():
+                os.makedirs(os.path.join(directory, table_name), exist_ok=True)
+                state = tables.get(table_name, {"watermark": 0, "rows": {}})
+                max_pk = conn.execute(
+                    f"SELECT MAX({pk}) FROM {archive.source(table_name, True)}").fetchone()[0] or 0
+                dirty = set()
+                if max_pk > state["watermark"]:
+                    dirty.update(range(state["watermark"] // PART_ROWS, max_pk // PART_ROWS + 1))
+                changed = conn.execute(
+                    "SELECT DISTINCT pk FROM SnapshotChanges WHERE table_name = ? AND seq <= ?",
+                    (table_name, last_seq))
+                dirty.update(row[0] // PART_ROWS for row in changed)
+
+                rows = dict(state["rows"])
+                for part in sorted(dirty):
+                    rows[str(part)] = _write_part(conn, directory, table_name, part)
+                tables[table_name] = {
+                    "watermark": max(max_pk, state["watermark"]),
+                    "rows": {part: count for part, count in rows.items() if count},
+                }
+                rewritten[table_name] = len(dirty)
+        finally:
+            conn.rollback()
+    # Only the changes this refresh has covered; later ones stay for the next.
+    db.execute("DELETE FROM SnapshotChanges WHERE seq <= ?", (last_seq,))
+    manifest["taken_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+    _write_manifest(directory, manifest)
+    return rewritten
+
+
+# --------------------- Reporting Mode ---------------------
+# Reports read the Parquet parts memory-mapped through pyarrow and never
+# touch hospital.db.
+def read_table(table_name, columns=None, directory=None):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ValueError("Reporting mode needs the optional 'pyarrow' package.") from e
+    files = sorted(glob.glob(os.path.join(directory or snapshot_dir(), table_name, "part-*.parquet")))
+    if not files:
+        schema = export._arrow_schema(pa, table_name)
+        return schema.empty_table().select(columns or schema.names)
+    return pa.concat_tables(pq.read_table(f, columns=columns, memory_map=True) for f in files)
+
+
+def _frame(table_name, columns, directory=None):
+    return read_table(table_name, columns, directory).to_pandas()
+
+
+def appointments_by_specialty(directory=None):
+    apps = _frame("Appointments", ["doc_id", "status"], directory)
+    doctors = _frame("Doctors", ["doc_id", "specialty"], directory)
+    merged = apps.merge(doctors, on="doc_id", how="left")
+    merged["specialty"] = merged["specialty"].fillna("Unknown")
+    return (merged.groupby(["specialty", "status"]).size().unstack(fill_value=0)
+                  .assign(total=lambda df: df.sum(axis=1)).sort_values("total", ascending=False))
+
+
+def appointments_per_month(directory=None):
+    apps = _frame("Appointments", ["app_date", "status"], directory)
+    month = pd.to_datetime(apps["app_date"], errors="coerce").dt.to_period("M").astype(str)
+    return apps.assign(month=month).groupby(["month", "status"]).size().unstack(fill_value=0)
+
+
+def revenue_per_quarter(directory=None):
+    bills = _frame("Billings", ["billed_on", "amount", "payment_status"], directory)
+    quarter = pd.to_datetime(bills["billed_on"], errors="coerce").dt.to_period("Q").astype(str)
+    return (bills.assign(quarter=quarter.where(bills["billed_on"].notna(), "Undated"))
+                 .pivot_table(index="quarter", columns="payment_status", values="amount",
+                              aggfunc="sum", fill_value=0))
+
+
+def diagnosis_counts(limit=20, directory=None):
+    records = _frame("MedicalRecords", ["diagnosis"], directory)
+    return records["diagnosis"].value_counts().head(limit).rename_axis("diagnosis").reset_index(name="records")
+
+
+def sql(query, directory=None):
+    # Ad-hoc SQL over the snapshot, with each table exposed as a view of its parts.
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ValueError("Ad-hoc snapshot SQL needs the optional 'duckdb' package.") from e
+    directory = directory or snapshot_dir()
+    conn = duckdb.connect()
+    try:
+        for table_name in PRIMARY_KEYS:
+            pattern = os.path.join(directory, table_name, "part-*.parquet").replace("'", "''")
+            if glob.glob(pattern):
+                conn.execute(f"CREATE VIEW {table_name} AS SELECT * FROM read_parquet('{pattern}')")
+        return conn.execute(query).df()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the Parquet reporting snapshot.")
+    parser.add_argument("--db", default=db.DB_FILE)
+    parser.add_argument("--out", default=None, help="snapshot directory (default: <db>_snapshot)")
+    parser.add_argument("--full", action="store_true", help="rebuild every part from scratch")
+    args = parser.parse_args()
+
+    from hms import migrations
+    db.configure(args.db)
+    migrations.migrate()
+    for table_name, parts in refresh(args.out or snapshot_dir(args.db), args.full).items():
+        print(f"{table_name}: {parts} part(s) rewritten")
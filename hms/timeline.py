@@ -0,0 +1,114 @@
+# hms/timeline.py - Patient 360: one patient's appointments, records and bills as a timeline
+from collections import namedtuple
+
+import pandas as pd
+
+from hms import archive, billing, cache, db
+
+PAGE_SIZE = 50
+
+# Newest first. Entries on the same timestamp are ordered by kind, then id.
+# A page is fetched with one compound query. Each branch seeks its covering
+# (pat_id, ts, id) index to the cursor, walks it backwards (see migrations)
+# and stops after one page, so the final sort never sees more than
+# 3 * (PAGE_SIZE + 1) rows, however long the patient's history is. Undated
+# entries have ts '' (last), and an appointment without a time sorts below
+# the timed ones of its day. _TS must stay identical to the indexed
+# expressions, or SQLite will not use the index for them.
+KINDS = ("appointment", "record", "bill")
+_BRANCHES = {
+    "appointment": """
+        SELECT 'appointment' AS kind, a.app_id AS entry_id,
+               COALESCE(a.app_date || COALESCE('T' || a.app_time, ''), '') AS ts,
+               'Appointment' AS title, d.name AS doctor, a.status AS status, NULL AS amount
+        FROM {Appointments} a LEFT JOIN Doctors d ON d.doc_id = a.doc_id
+        WHERE a.pat_id = ? {after}""",
+    "record": """
+        SELECT 'record', r.record_id, COALESCE(r.recorded_on, ''),
+               r.diagnosis, d.name, NULL, NULL
+        FROM MedicalRecords r LEFT JOIN Doctors d ON d.doc_id = r.doc_id
+        WHERE r.pat_id = ? {after}""",
+    "bill": """
+        SELECT 'bill', b.bill_id, COALESCE(b.billed_on, ''),
+               'Bill', NULL, b.payment_status, b.amount
+        FROM {Billings} b
+        WHERE b.pat_id = ? {after}""",
+}
+_TS = {"appointment": "COALESCE(a.app_date || COALESCE('T' || a.app_time, ''), '')",
+       "record": "COALESCE(r.recorded_on, '')",
+       "bill": "COALESCE(b.billed_on, '')"}
+_ID = {"appointment": "a.app_id", "record": "r.record_id", "bill": "b.bill_id"}
+
+# `next_cursor` is the (ts, kind, entry_id) of the last entry shown, or None
+# when the history has no older entries.
+Page = namedtuple("Page", ["entries", "next_cursor"])
+
+
+def _after(kind, cursor):
+    # Keyset predicate for "older than the cursor" in (ts DESC, kind, id DESC)
+    # order, specialised per branch since each branch has a single kind.
+    if cursor is None:
+        return "", ()
+    ts, cursor_kind, entry_id = cursor
+    rank, cursor_rank = KINDS.index(kind), KINDS.index(cursor_kind)
+    if rank > cursor_rank:
+        return f"AND {_TS[kind]} <= ?", (ts,)
+    if rank < cursor_rank:
+        return f"AND {_TS[kind]} < ?", (ts,)
+    # The bare `<=` is the range the index seeks on; the OR only filters it.
+    return f"AND {_TS[kind]} <= ? AND ({_TS[kind]} < ? OR {_ID[kind]} < ?)", (ts, ts, entry_id)
+
+
+@cache.cached_query("Appointments", "MedicalRecords", "Billings", "Doctors")
+def fetch_page(pat_id, cursor=None, page_size=PAGE_SIZE, include_archive=False):
+    branches, params = [], []
+    for kind in KINDS:
+        after, after_params = _after(kind, cursor)
+        sql = _BRANCHES[kind].format(after=after,
+                                     Appointments=archive.source("Appointments", include_archive),
+                                     Billings=archive.source("Billings", include_archive))
+        branches.append(f"SELECT * FROM ({sql} ORDER BY {_TS[kind]} DESC, {_ID[kind]} DESC LIMIT ?)")
+        params += [pat_id, *after_params, page_size + 1]
+    with archive.connection() if include_archive else db.connection():
+        entries = db.read_df(f"""
+            SELECT * FROM ({' UNION ALL '.join(branches)})
+            ORDER BY ts DESC, CASE kind {' '.join(f"WHEN '{k}' THEN {i}" for i, k in enumerate(KINDS))} END,
+                     entry_id DESC
+            LIMIT ?
+        """, params + [page_size + 1])
+
+    next_cursor = None
+    if len(entries) > page_size:
+        entries = entries.iloc[:page_size]
+        last = entries.iloc[-1]
+        next_cursor = (last["ts"], last["kind"], int(last["entry_id"]))
+    return Page(entries, next_cursor)
+
+
+@cache.cached_query("Patients", "Appointments", "MedicalRecords", "Billings")
+def patient_summary(pat_id, include_archive=False):
+    # The patient row plus per-kind counts, all index-only (COUNT over the
+    # pat_id ranges, outstanding balance from BillingSummary). None if the
+    # patient does not exist.
+    statuses = ", ".join("?" for _ in billing.OUTSTANDING_STATUSES)
+    with archive.connection() if include_archive else db.connection():
+        df = db.read_df(f"""
+            SELECT p.*,
+                   (SELECT COUNT(*) FROM {archive.source("Appointments", include_archive)} WHERE pat_id = p.pat_id) AS appointments,
+                   (SELECT COUNT(*) FROM MedicalRecords WHERE pat_id = p.pat_id) AS records,
+                   (SELECT COUNT(*) FROM {archive.source("Billings", include_archive)} WHERE pat_id = p.pat_id) AS bills,
+                   (SELECT COALESCE(SUM(total_amount), 0) FROM BillingSummary
+                    WHERE pat_id = p.pat_id AND payment_status IN ({statuses})) AS outstanding
+            FROM Patients p WHERE p.pat_id = ?
+        """, (*billing.OUTSTANDING_STATUSES, pat_id))
+    return None if df.empty else df.iloc[0]
+
+
+def load(pat_id, cursors=(None,), include_archive=False):
+    # The summary and every page loaded so far ("Load older" appends a
+    # cursor); each piece is cached, so only a new page costs a query.
+    summary = patient_summary(pat_id, include_archive)
+    if summary is None:
+        return None, pd.DataFrame(), None
+    pages = [fetch_page(pat_id, cursor, include_archive=include_archive) for cursor in cursors]
+    return summary, pd.concat([page.entries for page in pages], ignore_index=True), pages[-1].next_cursor
@@ -0,0 +1,147 @@
+# hms/writer.py - Single writer thread that group-commits queued writes
+import atexit
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from hms import cache, db
+
+ENABLED = os.environ.get("HMS_WRITER", "1") != "0"
+QUEUE_SIZE = int(os.environ.get("HMS_WRITE_QUEUE", "1000"))
+MAX_BATCH = 256
+SUBMIT_TIMEOUT = 5.0            # seconds a caller blocks on a full queue
+
+# Sessions hand writes to one thread instead of racing for SQLite's write
+# lock. The thread drains whatever is queued into one BEGIN IMMEDIATE
+# transaction (it never waits for a batch to fill: writes arriving during a
+# commit simply form the next batch); each write runs in its own SAVEPOINT, so a failing write is
+# rolled back alone and only its caller sees the error. Cache generations
+# are bumped after the commit and before any future resolves, so a caller
+# that waited never reads its own write from a stale cache.
+
+
+class WriterBusy(RuntimeError):
+    pass
+
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "tables", "future")
+
+    def __init__(self, fn, args, kwargs, tables):
+        self.fn, self.args, self.kwargs, self.tables = fn, args, kwargs, tables
+        self.future = Future()
+
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_thread = None
+_start_lock = threading.Lock()
+_stats = {"jobs": 0, "batches": 0, "failed": 0, "largest_batch": 0}
+
+
+def _run_inline(job):
+    # Writes issued from the writer thread itself, or from a thread that
+    # already holds a transaction, cannot wait on the queue without
+    # deadlocking; they join the transaction at hand instead.
+    try:
+        with db.transaction() as conn:
+            result = job.fn(conn, *job.args, **job.kwargs)
+    except BaseException as e:
+        job.future.set_exception(e)
+    else:
+        cache.bump(*job.tables)
+        job.future.set_result(result)
+    return job.future
+
+
+def _drain(first):
+    batch = [first]
+    while len(batch) < MAX_BATCH:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _commit(batch):
+    outcomes = []
+    try:
+        with db.transaction() as conn:
+            for job in batch:
+                conn.execute("SAVEPOINT write")
+                try:
+                    outcome = (job.fn(conn, *job.args, **job.kwargs), None)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write")
+                    outcome = (None, e)
+                conn.execute("RELEASE write")
+                outcomes.append(outcome)
+    except Exception as e:
+        # BEGIN or COMMIT itself failed (e.g. another process held the lock
+        # past busy_timeout): nothing in the batch was written.
+        outcomes = [(None, e)] * len(batch)
+    else:
+        cache.bump(*{t for job, (_, error) in zip(batch, outcomes) if error is None for t in job.tables})
+    for job, (result, error) in zip(batch, outcomes):
+        if error is None:
+            job.future.set_result(result)
+        else:
+            job.future.set_exception(error)
+    _stats["jobs"] += len(batch)
+    _stats["batches"] += 1
+    _stats["failed"] += sum(error is not None for _, error in outcomes)
+    _stats["largest_batch"] = max(_stats["largest_batch"], len(batch))
+
+
+def _loop():
+    while True:
+        first = _queue.get()
+        if first is None:
+            return
+        batch = _drain(first)
+        stop = None in batch
+        _commit([job for job in batch if job is not None])
+        if stop:
+            return
+
+
+def _ensure_started():
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    with _start_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_loop, name="hms-writer", daemon=True)
+            _thread.start()
+
+
+def submit(fn, *args, tables=(), **kwargs):
+    # Queues fn(conn, *args, **kwargs) and returns a Future for its result.
+    # `tables` are the cache generations to bump once the write is committed.
+    job = _Job(fn, args, kwargs, tables)
+    if not ENABLED or threading.current_thread() is _thread or db.in_transaction():
+        return _run_inline(job)
+    _ensure_started()
+    try:
+        _queue.put(job, timeout=SUBMIT_TIMEOUT)
+    except queue.Full:
+        raise WriterBusy(f"Write queue full ({QUEUE_SIZE} pending writes)") from None
+    return job.future
+
+
+def stop():
+    # Commits everything already queued, then ends the thread.
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        _queue.put(None)
+        _thread.join()
+    _thread = None
+
+
+def stats():
+    return dict(_stats, queued=_queue.qsize(),
+                mean_batch=_stats["jobs"] / _stats["batches"] if _stats["batches"] else 0.0)
+
+
+atexit.register(stop)
@@ -1,7 +1,8 @@
 # app.py - Hospital Management System with More Responsive Form Layout
 import streamlit as st
-import sqlite3
-import pandas as pd
+import plotly.express as px
+
+from hms import analytics, cache, db, migrations, scheduling
 
 # Page config
 st.set_page_config(page_title="Hospital Management System", page_icon="🏥", layout="wide")
@@ -59,51 +60,95 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Database setup
-DB_FILE = "hospital.db"
-
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.executescript('''
-        CREATE TABLE IF NOT EXISTS Patients (
-            pat_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL, age INTEGER, gender TEXT,
-            phone TEXT, address TEXT, email TEXT
-        );
-        CREATE TABLE IF NOT EXISTS Doctors (
-            doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL, specialty TEXT
-        );
-        CREATE TABLE IF NOT EXISTS Appointments (
-            app_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            pat_id INTEGER, doc_id INTEGER,
-            app_date TEXT, app_time TEXT, status TEXT DEFAULT 'Scheduled'
-        );
-    ''')
-    conn.commit()
-    conn.close()
+    migrations.migrate()
 
 init_db()
 
+@cache.cached_read
 def get_data(table):
-    conn = sqlite3.connect(DB_FILE)
-    df = pd.read_sql(f"SELECT * FROM {table}", conn)
-    conn.close()
-    return df
+    return db.read_df(f"SELECT * FROM {table}")
 
 def add_appointment(pat_id, doc_id, app_date, app_time, status):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO Appointments (pat_id, doc_id, app_date, app_time, status)
-        VALUES (?, ?, ?, ?, ?)
-    """, (pat_id, doc_id, str(app_date), str(app_time), status))
-    conn.commit()
-    conn.close()
+    return scheduling.book_appointment(pat_id, doc_id, app_date, app_time, status)
+
+# ----- Dashboard Figures -----
+# Aggregation happens in SQL (hms.analytics); figures are cached per filter
+# set and rebuilt only when one of their tables is written.
+STATUSES = ["Scheduled", "Confirmed", "Completed", "Cancelled"]
+
+@cache.cached_query("Appointments")
+def appointments_trend_figure(date_from, date_to, doc_id, statuses):
+    bucket = analytics.pick_bucket(date_from, date_to)
+    df = analytics.appointments_over_time(date_from, date_to, doc_id, statuses, bucket)
+    fig = px.bar(df, x="period", y="appointments", color="status",
+                 title=f"Appointments per {bucket}")
+    fig.update_layout(xaxis_title=None, legend_title=None)
+    return fig
+
+@cache.cached_query("Appointments")
+def appointments_status_figure(date_from, date_to, doc_id, statuses):
+    df = analytics.appointments_by_status(date_from, date_to, doc_id, statuses)
+    return px.pie(df, names="status", values="appointments", hole=0.4, title="By status")
+
+@cache.cached_query("Appointments", "Doctors")
+def appointments_doctor_figure(date_from, date_to, doc_id, statuses):
+    df = analytics.appointments_by_doctor(date_from, date_to, doc_id, statuses)
+    fig = px.bar(df, x="appointments", y="doctor", orientation="h", hover_data=["specialty"],
+                 title="Busiest doctors")
+    fig.update_layout(yaxis={"categoryorder": "total ascending", "title": None})
+    return fig
+
+@cache.cached_query("Patients")
+def demographics_figure():
+    df = analytics.patient_demographics()
+    return px.bar(df, x="age_band", y="patients", color="gender", barmode="group",
+                  title="Patients by age band and gender")
+
+@cache.cached_query("MedicalRecords")
+def diagnosis_figure():
+    df = analytics.diagnosis_frequencies()
+    fig = px.bar(df, x="records", y="diagnosis", orientation="h", title="Most frequent diagnoses")
+    fig.update_layout(yaxis={"categoryorder": "total ascending", "title": None})
+    return fig
 
 # Sidebar
 st.sidebar.title("🏥 Navigation")
-page = st.sidebar.radio("Go to", ["Home", "Appointments"])
+page = st.sidebar.radio("Go to", ["Home", "Dashboard", "Appointments"])
+
+if page == "Dashboard":
+    st.header("📊 Hospital Dashboard")
+
+    default_from, default_to = analytics.default_window()
+    col1, col2, col3 = st.columns([2, 1, 2])
+    with col1:
+        window = st.date_input("**Date range**", value=(default_from, default_to))
+    with col2:
+        doc_id = st.number_input("**Doctor ID** (0 = all)", min_value=0, step=1)
+    with col3:
+        statuses = st.multiselect("**Status**", STATUSES, default=STATUSES)
+
+    # date_input returns a single date while a range is still being picked
+    if len(window) == 2:
+        date_from, date_to = window
+        filters = (date_from, date_to, doc_id or None, tuple(statuses))
+
+        st.plotly_chart(appointments_trend_figure(*filters), use_container_width=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.plotly_chart(appointments_status_figure(*filters), use_container_width=True)
+        with col2:
+            st.plotly_chart(appointments_doctor_figure(*filters), use_container_width=True)
+    else:
+        st.info("Pick an end date to complete the range.")
+
+    st.subheader("Patients & Diagnoses")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(demographics_figure(), use_container_width=True)
+    with col2:
+        st.plotly_chart(diagnosis_figure(), use_container_width=True)
+
 
 if page == "Appointments":
     st.header("🗓️ Appointment Scheduling")
@@ -139,9 +184,13 @@ if page == "Appointments":
 
             if submitted:
                 if pat_id and doc_id and app_date and app_time:
-                    add_appointment(pat_id, doc_id, app_date, app_time, status)
-                    st.markdown('<div class="success-box">✅ Appointment scheduled successfully!</div>', unsafe_allow_html=True)
-                    st.balloons()
+                    try:
+                        add_appointment(pat_id, doc_id, app_date, app_time, status)
+                    except scheduling.SlotConflict as e:
+                        st.error(f"⚠️ {e}")
+                    else:
+                        st.markdown('<div class="success-box">✅ Appointment scheduled successfully!</div>', unsafe_allow_html=True)
+                        st.balloons()
                 else:
                     st.error("⚠️ All fields are required!")
 